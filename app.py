@@ -11,22 +11,62 @@ st.set_page_config(
 
 @st.cache_resource
 def load_bm25_search():
-    from src.classification_search.smart_search_loader import run_search
-    return run_search
+    from src.classification_search.smart_search_loader import get_engine, run_search_page
+    get_engine()  # warm the process-wide engine once
+    return run_search_page
 
 @st.cache_resource
 def load_semantic_engine():
-    from src.semantic_search.search_engine import search_documents
-    return search_documents
+    from src.semantic_search.search_engine import engine
+    # The BERT model loads in the background while the page renders
+    engine.warmup_async()
+    return engine
+
+@st.cache_resource
+def load_reranker():
+    from src.semantic_search.reranker import reranker
+    return reranker
+
+@st.cache_resource
+def load_poster_cache():
+    from src.posters.poster_cache import get_poster_cache
+    return get_poster_cache()
+
+@st.cache_resource
+def load_hybrid_engine():
+    from src.hybrid_search.hybrid_engine import get_hybrid_engine
+    return get_hybrid_engine()
+
+# Cards rendered per page ("Afficher plus" fetches the next one)
+PAGE_SIZE = 12
 
 @st.cache_data
 def load_metadata():
     return pd.read_csv("data/cleaned_movies.csv")
 
+@st.cache_resource
+def load_facet_table():
+    """Facet table built at index time; computed from the CSV if it is missing"""
+    from src.classification_search.facets import build_facets, load_facets
+    return load_facets("data/index_data") or build_facets(load_metadata())
+
+@st.cache_resource
+def load_metadata_lookup():
+    """Row records keyed by Doc_Id (CSV row number), plus a title -> Doc_Id index"""
+    records = load_metadata().to_dict("records")
+    by_title = {}
+    for doc_id, record in enumerate(records):
+        by_title.setdefault(record["Title"], doc_id)
+    return records, by_title
+
 with st.spinner("Chargement des moteurs..."):
-    run_search = load_bm25_search()
-    semantic_search = load_semantic_engine()
+    run_search_page = load_bm25_search()
+    semantic_engine = load_semantic_engine()
+    hybrid_engine = load_hybrid_engine()
+    reranker = load_reranker()
     df = load_metadata()
+    records, doc_id_by_title = load_metadata_lookup()
+    facets = load_facet_table()
 
 st.markdown("""
 <style>
@@ -121,15 +161,18 @@ with col_main:
             engine_choice = st.selectbox(
                 "Choisis ton moteur",
                 ["BM25 + Classification automatique",
-                 "Sémantique BERT (compréhension du sens)"],
+                 "Sémantique BERT (compréhension du sens)",
+                 "Hybride (mots-clés + sens)"],
                 label_visibility="visible", 
-                help="BM25 → mots-clés exacts / BERT → sens de la phrase"
+                help="BM25 → mots-clés exacts / BERT → sens de la phrase / Hybride → les deux, fusionnés"
             )
             
         with sub_c2:
             search = st.button("Rechercher", type="primary", use_container_width=True)
 
+is_hybrid = engine_choice.startswith("Hybride")
 is_bm25 = "BM25" in engine_choice
+engine_label = "Hybride" if is_hybrid else "BM25" if is_bm25 else "BERT"
 
 _, col_filters_main, _ = st.columns([1, 2, 1])
 
@@ -139,50 +182,110 @@ with col_filters_main:
         f_col1, f_col2 = st.columns(2)
         
         with f_col1:
-            all_genres = df["Genres"].dropna().astype(str).str.split(",").explode()
-            genres_clean = sorted({g.strip() for g in all_genres if g.strip()})
-            genres = ["Tous"] + genres_clean
+            genre_counts = facets["genres"]
+            genres = ["Tous"] + list(genre_counts)
             
-            genre = st.selectbox("Genre", genres)
-            years = ["Toutes"] + sorted(df["Release_Date"].astype(str).str[:4].dropna().unique(), reverse=True)
+            genre = st.selectbox(
+                "Genre", genres,
+                format_func=lambda g: g if g == "Tous" else f"{g} ({genre_counts[g]})"
+            )
+            years = ["Toutes"] + list(facets["years"])
             year = st.selectbox("Année", years)
             rating = st.slider("Note minimale", 0.0, 10.0, 6.0, 0.1)
             
         with f_col2:
             duration = st.slider("Durée (min)", 60, 300, (90, 180))
+            use_reranker = st.checkbox(
+                "Re-classer les premiers résultats",
+                help="Un cross-encoder re-note les meilleurs candidats (budget de latence limité)"
+            )
             director = st.text_input("Réalisateur")
             actor = st.text_input("Acteur")
 
+def fetch_page(state, offset=0):
+    """Append one page of the current search; the ranked candidates stay server-side"""
+    query = state["query"]
+    postprocess = None
+    if state["rerank"]:
+        # Only the top candidates are rescored, within the latency budget
+        postprocess = lambda results: reranker.rerank(query, results)
+    search_page = {
+        "Hybride": hybrid_engine.search_page,
+        "BM25": run_search_page,
+        "BERT": semantic_engine.search_page,
+    }[state["engine"]]
+
+    page = search_page(query, offset=offset, limit=PAGE_SIZE, filters=state["filters"],
+                       cursor=state["cursor"], postprocess=postprocess)
+    results = page["results"]
+    state["results"] += results.to_dict("records") if hasattr(results, "to_dict") else list(results)
+    state["cursor"] = page["cursor"]
+    state["total"] = page["total"]
+    state["next_offset"] = page["next_offset"]
+    state["info"] = page.get("info")
+
 if query and search:
-    with st.spinner(f"Recherche avec **{'BM25' if is_bm25 else 'BERT'}**..."):
-        if is_bm25:
-            results_df = run_search(query, top_n=30)
-            if results_df.empty:
-                st.error("Aucun résultat BM25")
-                st.stop()
-            results = results_df.to_dict("records")
-        else:
-            raw = semantic_search(query=query)
-            results = raw if isinstance(raw, list) else []
-
-        filtered = []
-        for film in results:
-            t = film.get("Title") if isinstance(film, dict) else getattr(film, "Title",str(film))
-            
-            match = df[df["Title"] == t]
-            if match.empty: continue
-            row = match.iloc[0]
+    # Filters are applied inside the engines, before ranking
+    filters = {
+        "genre": None if genre == "Tous" else genre,
+        "year": None if year == "Toutes" else year,
+        "min_rating": rating,
+        "runtime": duration,
+        "director": director,
+        "actor": actor,
+    }
+    st.session_state["search"] = {
+        "query": query, "engine": engine_label, "filters": filters, "rerank": use_reranker,
+        "cursor": None, "results": [],
+    }
+    with st.spinner(f"Recherche avec **{engine_label}**..."):
+        fetch_page(st.session_state["search"])
+
+search_state = st.session_state.get("search")
+
+if search_state:
+    # Cards follow the engine of the displayed search, not the current selection
+    engine_label = search_state["engine"]
+    is_hybrid = engine_label == "Hybride"
+    is_bm25 = engine_label == "BM25"
 
-            if genre != "Tous" and genre not in str(row.get("Genres", "")): continue
-            if year != "Toutes" and str(row.get("Release_Date", "")[:4]) != year: continue
-            if float(row.get("Vote_Average", 0)) < rating: continue
-            if not (duration[0] <= row.get("Runtime", 0) <= duration[1]): continue
-            if director and director.lower() not in str(row.get("Director", "")).lower(): continue
-            if actor and actor.lower() not in str(row.get("Cast", "")).lower(): continue
+    info = search_state["info"]
+    if info:
+        # Both engines run concurrently; one past its time budget is left out
+        skipped = info["timed_out"] + list(info["errors"]) + info["busy"]
+        if skipped:
+            st.warning(f"Moteur(s) ignoré(s) (délai dépassé, erreur ou occupé) : {', '.join(skipped)}")
+        if info["warming"]:
+            st.info(f"Chargement en cours, résultats sans : {', '.join(info['warming'])}")
+    if is_bm25 and not search_state["results"]:
+        st.error("Aucun résultat BM25")
+        st.stop()
 
-            filtered.append((film, row))
+    filtered = []
+    for film in search_state["results"]:
+        t = film.get("Title") if isinstance(film, dict) else getattr(film, "Title",str(film))
 
-    st.success(f"**{len(filtered)} film(s) trouvé(s)** • Moteur : **{'BM25' if is_bm25 else 'BERT'}**")
+        # Join on the stable Doc_Id; the title index covers results without one
+        doc_id = film.get("Doc_Id") if isinstance(film, dict) else None
+        if doc_id is None or pd.isna(doc_id):
+            doc_id = doc_id_by_title.get(t)
+        if doc_id is None or not 0 <= int(doc_id) < len(records): continue
+        row = records[int(doc_id)]
+
+        filtered.append((film, row))
+
+    st.success(f"**{search_state['total']} film(s) trouvé(s)** • {len(filtered)} affiché(s) • Moteur : **{engine_label}**")
+
+    # Live facet counts for the current results
+    if filtered:
+        from src.classification_search.facets import count_facets
+        result_facets = count_facets(row for _, row in filtered)
+        top_genres = result_facets["genres"].most_common(6)
+        st.caption(" • ".join(f"{g} ({n})" for g, n in top_genres))
+
+    # Cached posters are served from local disk; the others load from TMDB in
+    # the browser this time and download in the background for the next render
+    posters = load_poster_cache().local_files(row.get("Poster_Path") for _, row in filtered)
 
     cols = st.columns(4)
     
@@ -192,13 +295,19 @@ if query and search:
         with col:
             with st.container(border=True):
                 
-                poster_url = f"https://image.tmdb.org/t/p/w300{row.get('Poster_Path','')}"
+                poster_url = posters.get(row.get("Poster_Path")) or f"https://image.tmdb.org/t/p/w300{row.get('Poster_Path','')}"
                 st.image(poster_url, use_container_width=True)
                 
                 st.markdown(f"#### {row['Title']}")
                 st.caption(f"{row['Release_Date'][:4]} • {row.get('Director','Inconnu')}")
                 
-                if is_bm25:
+                if is_hybrid:
+                    # Fused scores only make sense relative to the best result
+                    score = film_data.get('score', 0)
+                    best = max(f.get('score', 0) for f, _ in filtered) or 1.0
+                    progress = min(score / best, 1.0)
+                    st.markdown(f":violet[**Hybride: {int(progress*100)}%**]")
+                elif is_bm25:
                     score = film_data.get('score', 0)
                     progress = min(score / 30.0, 1.0)
                     st.markdown(f":blue[**BM25: {score:.2f}**]")
@@ -237,6 +346,10 @@ if query and search:
                     **Mots-clés:** {keywords_display}  
                     """)
 
+    if search_state["next_offset"] is not None:
+        # Next page from the server-side candidates, on demand
+        st.button("Afficher plus", on_click=fetch_page, args=(search_state, search_state["next_offset"]))
+
 else:
     st.info("Recherchez un film !")
 st.markdown("---")
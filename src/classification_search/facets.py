@@ -0,0 +1,76 @@
+import pandas as pd
+import json
+import os
+import sys
+from collections import Counter
+
+FACETS_FILE = "facets.json"
+
+
+def split_list(value):
+    """'Action, Drama' -> ['Action', 'Drama']"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return []
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def facet_values(record):
+    """Facet values of one movie record"""
+    year = str(record.get("Release_Date") or "")[:4]
+    return {
+        "genres": split_list(record.get("Genres")),
+        "years": [year] if year.isdigit() else [],
+        "directors": split_list(record.get("Director")),
+        "cast": split_list(record.get("Cast")),
+    }
+
+
+def count_facets(records):
+    """Document counts per facet value for any set of records (e.g. a result page)"""
+    counts = {"genres": Counter(), "years": Counter(), "directors": Counter(), "cast": Counter()}
+    for record in records:
+        for facet, values in facet_values(record).items():
+            counts[facet].update(set(values))
+    return counts
+
+
+def build_facets(df):
+    """Facet table of the indexed documents: value -> document count, per facet"""
+    counts = count_facets(df.to_dict("records"))
+    return {
+        "N": len(df),
+        "genres": dict(sorted(counts["genres"].items())),
+        "years": dict(sorted(counts["years"].items(), reverse=True)),
+        "directors": dict(counts["directors"].most_common()),
+        "cast": dict(counts["cast"].most_common()),
+    }
+
+
+def save_facets(facets, folder_path):
+    os.makedirs(folder_path, exist_ok=True)
+    with open(os.path.join(folder_path, FACETS_FILE), "w", encoding="utf-8") as f:
+        json.dump(facets, f, ensure_ascii=False)
+
+
+def load_facets(folder_path):
+    """Facet table saved next to the index, or None if it was never built"""
+    path = os.path.join(folder_path, FACETS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    # python -m src.classification_search.facets data/documents.jsonl data/index_data
+    from .smart_search_engine import SmartSearchEngine
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "data/documents.jsonl"
+    index_folder = sys.argv[2] if len(sys.argv) > 2 else "data/index_data"
+    if source.endswith(".jsonl"):
+        documents = SmartSearchEngine.load_document_store(source)
+    else:
+        documents = SmartSearchEngine.load_json_files(source)
+    facets = build_facets(documents)
+    save_facets(facets, index_folder)
+    print(f"✓ Facets saved: {len(facets['genres'])} genres, {len(facets['years'])} years")
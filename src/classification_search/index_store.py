@@ -0,0 +1,282 @@
+import numpy as np
+import json
+import math
+import os
+import sys
+from collections.abc import Mapping
+from functools import lru_cache
+
+# Binary index layout (one folder, every array memory-mappable):
+#   index_header.json  N, fields, avg lengths, term ranges, recognition sets
+#   terms.npy          sorted UTF-8 terms of every field, concatenated field by field
+#   term_offsets.npy   byte offset of each term's postings in postings.bin (+1 sentinel)
+#   term_df.npy        document frequency of each term
+#   postings.bin       varint stream of (doc_id delta, tf) pairs
+#   doc_lengths.npy    token count per (field, doc_id)
+HEADER_FILE = "index_header.json"
+TERMS_FILE = "terms.npy"
+OFFSETS_FILE = "term_offsets.npy"
+DF_FILE = "term_df.npy"
+POSTINGS_FILE = "postings.bin"
+DOC_LENGTHS_FILE = "doc_lengths.npy"
+FORMAT_VERSION = 1
+
+
+def encode_varints(values):
+    """Encode non-negative integers as LEB128 varints"""
+    out = bytearray()
+    for value in values:
+        value = int(value)
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_varints(buffer):
+    """Vectorized LEB128 decoding of a uint8 buffer"""
+    data = np.asarray(buffer, dtype=np.uint64)
+    if data.size == 0:
+        return data
+
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # Position of each byte inside its varint -> 7-bit shift
+    group = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = (np.arange(len(data)) - starts[group]).astype(np.uint64) * np.uint64(7)
+    return np.add.reduceat((data & np.uint64(0x7F)) << shifts, starts)
+
+
+def is_binary_index(folder_path):
+    return os.path.exists(os.path.join(folder_path, HEADER_FILE))
+
+
+def write_binary_index(
+    folder_path,
+    inverted_index,
+    doc_lengths,
+    N,
+    fields,
+    avg_doc_length,
+    recognition_sets,
+    lemma_table=None,
+    doc_ids=None,
+):
+    """
+    Write an index to the binary format.
+    inverted_index: field -> term -> [(doc_id, tf), ...]
+    doc_lengths: field -> {doc_id: length}
+    recognition_sets: name -> iterable of terms (directors_set, genres_set, ...)
+    lemma_table: surface form -> lemma, for the lookup query analyzer
+    doc_ids: Doc_Id of each internal doc id, to align the documents on load
+    """
+    os.makedirs(folder_path, exist_ok=True)
+
+    all_terms = []
+    offsets = [0]
+    dfs = []
+    term_ranges = {}
+    postings_blob = bytearray()
+
+    for field in fields:
+        terms = sorted(inverted_index.get(field, {}))
+        term_ranges[field] = [len(all_terms), len(all_terms) + len(terms)]
+
+        for term in terms:
+            postings = sorted((int(doc_id), int(tf)) for doc_id, tf in inverted_index[field][term])
+            pairs = []
+            previous = 0
+            for doc_id, tf in postings:
+                pairs.append(doc_id - previous)
+                pairs.append(tf)
+                previous = doc_id
+
+            postings_blob += encode_varints(pairs)
+            all_terms.append(term)
+            offsets.append(len(postings_blob))
+            dfs.append(len(postings))
+
+    n_docs = 1 + max(
+        (int(doc_id) for lengths in doc_lengths.values() for doc_id in lengths),
+        default=-1,
+    )
+    lengths_matrix = np.zeros((len(fields), n_docs), dtype=np.int32)
+    for field_no, field in enumerate(fields):
+        for doc_id, length in doc_lengths.get(field, {}).items():
+            lengths_matrix[field_no, int(doc_id)] = length
+
+    # Serving processes memory-map these files: every file is written under a
+    # temporary name and renamed over the old one, so existing mappings keep
+    # reading the previous version instead of a truncated file (SIGBUS)
+    encoded_terms = [term.encode("utf-8") for term in all_terms]
+    arrays = {
+        TERMS_FILE: np.array(encoded_terms, dtype=bytes),
+        OFFSETS_FILE: np.array(offsets, dtype=np.int64),
+        DF_FILE: np.array(dfs, dtype=np.int32),
+        DOC_LENGTHS_FILE: lengths_matrix,
+    }
+    for name, array in arrays.items():
+        with open(os.path.join(folder_path, name + ".tmp"), "wb") as f:
+            np.save(f, array)
+    with open(os.path.join(folder_path, POSTINGS_FILE + ".tmp"), "wb") as f:
+        f.write(postings_blob)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "N": int(N),
+        "fields": list(fields),
+        "avg_doc_length": {field: float(avg_doc_length.get(field, 0)) for field in fields},
+        "term_ranges": term_ranges,
+        "recognition_sets": {name: sorted(terms) for name, terms in recognition_sets.items()},
+        "lemma_table": dict(lemma_table or {}),
+        "doc_ids": [int(doc_id) for doc_id in doc_ids] if doc_ids is not None else None,
+    }
+    with open(os.path.join(folder_path, HEADER_FILE + ".tmp"), "w", encoding="utf-8") as f:
+        json.dump(header, f, ensure_ascii=False)
+
+    # Header last: it is what marks the folder as a binary index
+    for name in [*arrays, POSTINGS_FILE, HEADER_FILE]:
+        path = os.path.join(folder_path, name)
+        os.replace(path + ".tmp", path)
+
+
+class FieldPostings(Mapping):
+    """Read-only term -> {doc_id: tf} view over one field of a BinaryIndex"""
+
+    def __init__(self, index, start, end, cache_size=4096):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.terms = index.terms[start:end]
+        self._decode = lru_cache(maxsize=cache_size)(self._decode_term)
+
+    def term_id(self, term):
+        """Position of term in the global term table, or None"""
+        if not isinstance(term, str) or self.end == self.start:
+            return None
+        # UTF-8 byte order matches code point order, so the table stays sorted
+        key = term.encode("utf-8")
+        pos = int(np.searchsorted(self.terms, key))
+        if pos < len(self.terms) and self.terms[pos] == key:
+            return self.start + pos
+        return None
+
+    def _decode_term(self, term_id):
+        begin, end = self.index.offsets[term_id], self.index.offsets[term_id + 1]
+        values = decode_varints(self.index.postings[begin:end])
+        doc_ids = np.cumsum(values[0::2])
+        return dict(zip(doc_ids.tolist(), values[1::2].tolist()))
+
+    def document_frequency(self, term):
+        term_id = self.term_id(term)
+        return 0 if term_id is None else int(self.index.df[term_id])
+
+    def __getitem__(self, term):
+        term_id = self.term_id(term)
+        if term_id is None:
+            raise KeyError(term)
+        return self._decode(term_id)
+
+    def __contains__(self, term):
+        return self.term_id(term) is not None
+
+    def __iter__(self):
+        return (term.decode("utf-8") for term in self.terms)
+
+    def __len__(self):
+        return self.end - self.start
+
+
+class FieldIdf(Mapping):
+    """term -> BM25 idf, computed on demand from the stored document frequencies"""
+
+    def __init__(self, postings, N):
+        self.postings = postings
+        self.N = N
+
+    def __getitem__(self, term):
+        df = self.postings.document_frequency(term)
+        if df == 0:
+            raise KeyError(term)
+        return math.log((self.N - df + 0.5) / (df + 0.5) + 1.0)
+
+    def __iter__(self):
+        return iter(self.postings)
+
+    def __len__(self):
+        return len(self.postings)
+
+
+class BinaryIndex:
+    """Memory-mapped BM25 index. Opening it only maps the files."""
+
+    def __init__(self, folder_path):
+        with open(os.path.join(folder_path, HEADER_FILE), "r", encoding="utf-8") as f:
+            header = json.load(f)
+
+        if header.get("format_version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported index format version: {header.get('format_version')}"
+            )
+
+        self.N = header["N"]
+        self.fields = header["fields"]
+        self.avg_doc_length = header["avg_doc_length"]
+        self.recognition_sets = {
+            name: set(terms) for name, terms in header["recognition_sets"].items()
+        }
+        self.lemma_table = header.get("lemma_table", {})
+        self.doc_ids = header.get("doc_ids")
+
+        self.terms = np.load(os.path.join(folder_path, TERMS_FILE), mmap_mode="r")
+        self.offsets = np.load(os.path.join(folder_path, OFFSETS_FILE), mmap_mode="r")
+        self.df = np.load(os.path.join(folder_path, DF_FILE), mmap_mode="r")
+        lengths = np.load(os.path.join(folder_path, DOC_LENGTHS_FILE), mmap_mode="r")
+        postings_path = os.path.join(folder_path, POSTINGS_FILE)
+        if os.path.getsize(postings_path):
+            self.postings = np.memmap(postings_path, dtype=np.uint8, mode="r")
+        else:
+            self.postings = np.zeros(0, dtype=np.uint8)
+
+        self.doc_lengths = {field: lengths[i] for i, field in enumerate(self.fields)}
+        self.field_postings = {
+            field: FieldPostings(self, *header["term_ranges"][field])
+            for field in self.fields
+        }
+        self.field_idf = {
+            field: FieldIdf(self.field_postings[field], self.N) for field in self.fields
+        }
+
+
+def convert_json_index(json_folder, binary_folder=None):
+    """Convert inverted_index.json + metadata.json into the binary format"""
+    binary_folder = binary_folder or json_folder
+
+    with open(os.path.join(json_folder, "inverted_index.json"), "r", encoding="utf-8") as f:
+        inverted_index = json.load(f)
+    with open(os.path.join(json_folder, "metadata.json"), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+
+    write_binary_index(
+        binary_folder,
+        inverted_index=inverted_index,
+        doc_lengths=metadata["doc_lengths"],
+        N=metadata["N"],
+        fields=metadata["fields"],
+        avg_doc_length=metadata["avg_doc_length"],
+        recognition_sets={
+            name: metadata[name]
+            for name in ["directors_set", "genres_set", "title_words", "years_set"]
+        },
+        lemma_table=metadata.get("lemma_table"),
+        doc_ids=metadata.get("doc_ids"),
+    )
+    print(f"✓ Binary index written to '{binary_folder}'")
+
+
+if __name__ == "__main__":
+    # python -m src.classification_search.index_store data/index_data [output_folder]
+    source = sys.argv[1] if len(sys.argv) > 1 else "data/index_data"
+    target = sys.argv[2] if len(sys.argv) > 2 else None
+    convert_json_index(source, target)
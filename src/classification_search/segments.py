@@ -0,0 +1,173 @@
+import os
+import json
+import math
+from collections.abc import Mapping
+
+# Incremental index updates, stored next to the base index:
+#   segments/segment_00001.json  movies added after the base index was built:
+#                                records, postings, doc lengths, recognition
+#                                terms and lemmas (internal doc ids continue
+#                                after the base documents)
+#   tombstones.json              internal ids of deleted movies, and the
+#                                recognition terms no live movie uses anymore
+# An update is a tombstone plus an added movie. merge_segments() folds the
+# segment files into one; a full rebuild folds everything into the base index.
+
+SEGMENTS_DIR = "segments"
+TOMBSTONES_FILE = "tombstones.json"
+
+
+class SegmentedPostings(Mapping):
+    """term -> {doc_id: tf} of the base index and the added movies, minus tombstones"""
+
+    def __init__(self, base, delta, tombstones):
+        self.base = base
+        self.delta = delta
+        self.tombstones = tombstones
+        self._merged = {}
+
+    def __getitem__(self, term):
+        merged = self._merged.get(term)
+        if merged is None:
+            base = self.base.get(term)
+            delta = self.delta.get(term)
+            if base is None and delta is None:
+                raise KeyError(term)
+
+            merged = {}
+            for postings in (base, delta):
+                if postings:
+                    for doc_id, tf in postings.items():
+                        if doc_id not in self.tombstones:
+                            merged[doc_id] = tf
+            self._merged[term] = merged
+        return merged
+
+    def __iter__(self):
+        yield from self.base
+        for term in self.delta:
+            if term not in self.base:
+                yield term
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class SegmentedIdf(Mapping):
+    """BM25 idf over the live movies, same expression as prepare_scoring()"""
+
+    def __init__(self, postings, N):
+        self.postings = postings
+        self.N = N
+        self._idf = {}
+
+    def __getitem__(self, term):
+        idf = self._idf.get(term)
+        if idf is None:
+            df = len(self.postings[term])
+            idf = math.log((self.N - df + 0.5) / (df + 0.5) + 1.0)
+            self._idf[term] = idf
+        return idf
+
+    def __iter__(self):
+        return iter(self.postings)
+
+    def __len__(self):
+        return len(self.postings)
+
+
+def segment_paths(folder_path):
+    """Segment files of an index folder, oldest first"""
+    folder = os.path.join(folder_path, SEGMENTS_DIR)
+    if not os.path.isdir(folder):
+        return []
+    return [
+        os.path.join(folder, name)
+        for name in sorted(os.listdir(folder))
+        if name.startswith("segment_") and name.endswith(".json")
+    ]
+
+
+def write_segment(folder_path, segment, number=None):
+    """Write one segment (see SmartSearchEngine.add_documents) and return its path"""
+    folder = os.path.join(folder_path, SEGMENTS_DIR)
+    os.makedirs(folder, exist_ok=True)
+    if number is None:
+        existing = segment_paths(folder_path)
+        number = int(os.path.basename(existing[-1])[8:-5]) + 1 if existing else 1
+
+    data = {
+        "doc_ids": [int(doc_id) for doc_id in segment["doc_ids"]],
+        "records": segment["records"],
+        "index": {
+            field: {term: [[int(doc_id), int(tf)] for doc_id, tf in postings] for term, postings in terms.items()}
+            for field, terms in segment["index"].items()
+        },
+        "doc_lengths": {
+            field: [[int(doc_id), int(length)] for doc_id, length in lengths.items()]
+            for field, lengths in segment["doc_lengths"].items()
+        },
+        "recognition": {name: sorted(terms) for name, terms in segment["recognition"].items()},
+        "lemma_table": segment.get("lemma_table", {}),
+    }
+
+    path = os.path.join(folder, f"segment_{number:05d}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_segment(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    return {
+        "doc_ids": data["doc_ids"],
+        "records": data["records"],
+        "index": {
+            field: {term: [tuple(posting) for posting in postings] for term, postings in terms.items()}
+            for field, terms in data["index"].items()
+        },
+        "doc_lengths": {
+            field: {doc_id: length for doc_id, length in lengths}
+            for field, lengths in data["doc_lengths"].items()
+        },
+        "recognition": {name: set(terms) for name, terms in data["recognition"].items()},
+        "lemma_table": data.get("lemma_table", {}),
+    }
+
+
+def write_tombstones(folder_path, doc_ids, removed_terms):
+    os.makedirs(folder_path, exist_ok=True)
+    path = os.path.join(folder_path, TOMBSTONES_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "doc_ids": sorted(int(doc_id) for doc_id in doc_ids),
+                "removed_terms": {name: sorted(terms) for name, terms in removed_terms.items()},
+            },
+            f,
+            ensure_ascii=False,
+        )
+    os.replace(path + ".tmp", path)
+
+
+def read_tombstones(folder_path):
+    """(deleted internal ids, name -> recognition terms to drop); empty if none"""
+    path = os.path.join(folder_path, TOMBSTONES_FILE)
+    if not os.path.exists(path):
+        return set(), {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return set(data["doc_ids"]), {name: set(terms) for name, terms in data["removed_terms"].items()}
+
+
+def clear_segments(folder_path):
+    """Remove segment files and tombstones, e.g. after a full rebuild"""
+    for path in segment_paths(folder_path):
+        os.remove(path)
+    tombstones = os.path.join(folder_path, TOMBSTONES_FILE)
+    if os.path.exists(tombstones):
+        os.remove(tombstones)
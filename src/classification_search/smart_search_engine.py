@@ -3,38 +3,269 @@ import numpy as np
 from collections import defaultdict
 import re
 import math
+import heapq
+from collections import Counter
+from functools import lru_cache
 import spacy
 import json
 import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from .facets import build_facets, save_facets
+from .index_store import HEADER_FILE, BinaryIndex, is_binary_index, write_binary_index
+from .segments import (
+    SegmentedIdf,
+    SegmentedPostings,
+    clear_segments,
+    read_segment,
+    read_tombstones,
+    segment_paths,
+    write_segment,
+    write_tombstones,
+)
+from ..common.document_store import DocumentStore
+from ..common.filter_index import FilterIndex
+from ..common.pagination import MAX_RESULTS, PAGE_SIZE, cursor_store
+from ..common.result_cache import folder_version
+
+# Slack for float rounding when comparing partial scores to the top-k threshold
+PRUNING_EPSILON = 1e-9
+
+# Only tagger + attribute_ruler + lemmatizer are needed for lemmas and stopwords
+SPACY_EXCLUDE = ["parser", "ner"]
+# Distinct texts whose analysis is memoized (queries, repeated genres/directors)
+ANALYSIS_CACHE_SIZE = 100_000
+ANALYZERS = ["full", "lookup"]
+
+# Parallel index build: documents per worker task and texts per nlp.pipe batch
+SHARD_SIZE = 5000
+BUILD_BATCH_SIZE = 256
+
+# Field whose live postings decide if a recognition term is still used
+RECOGNITION_FIELDS = {
+    "directors_set": "Director",
+    "genres_set": "Genres",
+    "title_words": "Title",
+    "years_set": "Release_Date",
+}
+
+# spaCy model of a build worker process, loaded once by _init_build_worker()
+_worker_nlp = None
+
+
+def lemma_tokens(doc):
+    """Lemmas kept from a spaCy doc"""
+    # Extract lemmas with spaCy's built-in stopwords
+    return [
+        token.lemma_
+        for token in doc
+        if not token.is_stop  # spaCy's built-in stopwords
+        and not token.is_punct  # Remove punctuation
+        and not token.is_space  # Remove whitespace
+        and len(token.lemma_) > 2  # Remove short tokens
+        and token.is_alpha  # Keep only alphabetic tokens
+    ]
+
+
+def build_lemma_table(lemma_counts):
+    """
+    surface form -> lemma for the lookup analyzer. Forms spaCy lemmatized in
+    more than one way (the lemma depends on context) map to None: queries
+    containing them go through the full pipeline.
+    """
+    return {
+        surface: next(iter(lemmas)) if len(lemmas) == 1 else None
+        for surface, lemmas in lemma_counts.items()
+    }
+
+
+def merge_lemma(table, surface, lemma):
+    """Add one entry to a lemma table; conflicting lemmas make the form ambiguous"""
+    if surface not in table:
+        table[surface] = lemma
+    elif table[surface] != lemma:
+        table[surface] = None
+
+
+def year_tokens(text):
+    """Years of a date field (format: YYYY-MM-DD or just YYYY)"""
+    return re.findall(r"\b(?:19|20)\d{2}\b", str(text).lower())
+
+
+def build_shard(nlp, fields, rows, batch_size=BUILD_BATCH_SIZE):
+    """
+    Partial inverted index of one shard of documents.
+    rows is a list of (doc_id, {field: value}). Every distinct text of the
+    shard goes through nlp.pipe once; the tokens are reused for the postings,
+    the recognition dictionaries and the lemma table.
+    """
+    # Distinct texts to analyze: field values plus single genre names
+    texts = {}
+    for _, values in rows:
+        for field in fields:
+            value = values[field]
+            if field == "Release_Date" or pd.isna(value):
+                continue
+            texts.setdefault(str(value).lower(), None)
+            if field == "Genres":
+                for genre in str(value).split(","):
+                    texts.setdefault(genre.strip().lower(), None)
+
+    lemma_counts = defaultdict(Counter)
+    docs = nlp.pipe(list(texts), batch_size=batch_size)
+    for text, doc in zip(list(texts), docs):
+        texts[text] = lemma_tokens(doc)
+        for token in doc:
+            if token.is_alpha:
+                lemma_counts[token.lower_][token.lemma_] += 1
+
+    index = {field: defaultdict(list) for field in fields}
+    doc_lengths = {field: {} for field in fields}
+    recognition = {"directors_set": set(), "genres_set": set(), "title_words": set(), "years_set": set()}
+
+    for idx, values in rows:
+        for field in fields:
+            value = values[field]
+            if pd.isna(value):
+                tokens = []
+            elif field == "Release_Date":
+                tokens = year_tokens(value)
+                recognition["years_set"].update(tokens)
+            else:
+                tokens = texts[str(value).lower()]
+            doc_lengths[field][idx] = len(tokens)
+
+            term_freq = defaultdict(int)
+            for token in tokens:
+                term_freq[token] += 1
+
+            for term, freq in term_freq.items():
+                index[field][term].append((idx, freq))
+
+        if not pd.isna(values["Director"]):
+            recognition["directors_set"].update(texts[str(values["Director"]).lower()])
+        if not pd.isna(values["Genres"]):
+            for genre in str(values["Genres"]).split(","):
+                recognition["genres_set"].update(texts[genre.strip().lower()])
+        if not pd.isna(values["Title"]):
+            recognition["title_words"].update(texts[str(values["Title"]).lower()])
+
+    return {
+        "index": index,
+        "doc_lengths": doc_lengths,
+        "recognition": recognition,
+        "lemma_counts": lemma_counts,
+    }
+
+
+def _init_build_worker():
+    global _worker_nlp
+    _worker_nlp = spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDE)
+
+
+def _build_shard_worker(args):
+    return build_shard(_worker_nlp, *args)
+
+
+class ScoringState:
+    """
+    Everything a search reads: postings, idf, length norms, the document rows
+    and the caches built from them (per-term score bounds, filter masks).
+    prepare_scoring() builds a new one and publishes it with a single
+    assignment, so a search that takes engine.scoring once never sees a
+    half-applied update.
+    """
+
+    def __init__(self, k1, b, postings, idf, length_norm, df):
+        self.k1 = k1
+        self.b = b
+        self.postings = postings
+        self.idf = idf
+        self.length_norm = length_norm
+        self.df = df
+        self.max_scores = {}
+        # Built on the first filtered search
+        self.filter_index = None
+
 
 class SmartSearchEngine:
-    def __init__(self, df=None, json_folder=None, load_from_file=None):
+    def __init__(
+        self,
+        df=None,
+        json_folder=None,
+        load_from_file=None,
+        analyzer="full",
+        n_process=1,
+        documents_path=None,
+    ):
         """
         Initialize the search engine with either:
         - df: A pandas DataFrame (original behavior)
         - json_folder: Path to folder containing JSON files
+        - documents_path: Path to a document store (documents.jsonl, see document_store.py)
         - load_from_file: Path to pre-built index
+        analyzer selects query analysis: "full" (spaCy tagger + lemmatizer, same
+        as indexing) or "lookup" (tokenizer + lemma table learned at index time)
+        n_process: worker processes used when building the index from scratch
         """
-        # Load data from JSON folder if provided
-        if json_folder is not None:
+        if analyzer not in ANALYZERS:
+            raise ValueError(f"Unknown analyzer '{analyzer}', expected one of {ANALYZERS}")
+        self.analyzer = analyzer
+
+        # Load data from the document store or the JSON folder if provided
+        if documents_path is not None:
+            print(f"Loading document store: {documents_path}")
+            self.df = self.load_document_store(documents_path)
+            self.documents_source = "store"
+        elif json_folder is not None:
             print(f"Loading JSON files from: {json_folder}")
             self.df = self.load_json_files(json_folder)
+            self.documents_source = "json"
         elif df is not None:
             self.df = df
+            self.documents_source = "df"
         else:
-            raise ValueError("Must provide either df or json_folder")
+            raise ValueError("Must provide either df, json_folder or documents_path")
+
+        # Stable document ID: row number in cleaned_movies.csv
+        if "Doc_Id" not in self.df.columns:
+            self.df["Doc_Id"] = self.df.index
+        # Internal doc id == row position == label: filter masks are positional
+        # and results are read back with df.loc (a filtered df keeps its labels)
+        self.df = self.df.reset_index(drop=True)
 
         self.N = len(self.df)
 
         # Load spaCy model
         print("Loading spaCy model...")
-        self.nlp = spacy.load("en_core_web_sm")
+        self.nlp = spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDE)
+        self.analyze = lru_cache(maxsize=ANALYSIS_CACHE_SIZE)(self._analyze_text)
+        # surface form -> lemma, learned while indexing (lookup analyzer)
+        self.lemma_table = {}
 
         # Define fields to index
         self.fields = ["Title", "Director", "Genres", "Overview", "Release_Date"]
 
+        # Set when the index is memory-mapped from the binary format
+        self.index_store = None
+        # Dict-mode postings and idf of the base index, computed once
+        self.base_scoring = None
+        # Incremental updates (see segments.py): movies added since the base
+        # index was built, merged into one in-memory segment, internal ids of
+        # deleted movies, and added segments not yet written to disk
+        self.segment = None
+        self.tombstones = set()
+        self.removed_terms = {}
+        self.pending_segments = []
+        self._update_lock = threading.Lock()
+        # Result cache version: fingerprint of the loaded index folder, and
+        # count of scoring refreshes (updates) since
+        self.data_version = None
+        self.generation = 0
+
         if load_from_file:
             # Load index from file
             self.load_index(load_from_file)
@@ -48,9 +279,11 @@ class SmartSearchEngine:
             self.title_words = set()
             self.years_set = set()
 
-            self.build_index()
+            self.build_index(n_process=n_process)
             self.build_recognition_dicts()
 
+        self.prepare_scoring()
+
     @staticmethod
     def load_json_files(folder_path):
         """
@@ -76,6 +309,7 @@ class SmartSearchEngine:
             try:
                 with open(json_file, "r", encoding="utf-8") as f:
                     movie_data = json.load(f)
+                    movie_data["Doc_Id"] = SmartSearchEngine.doc_id_from_filename(json_file)
                     movies.append(movie_data)
             except Exception as e:
                 print(f"Warning: Could not load {json_file.name}: {e}")
@@ -96,6 +330,23 @@ class SmartSearchEngine:
 
         return df
 
+    @staticmethod
+    def load_document_store(path):
+        """DataFrame of every movie of a document store, in Doc_Id order"""
+        df = DocumentStore(path).to_dataframe()
+        print(f"Successfully loaded {len(df)} movies")
+
+        for col in ["Title", "Director", "Genres", "Overview", "Release_Date"]:
+            if col not in df.columns:
+                df[col] = None
+        return df
+
+    @staticmethod
+    def doc_id_from_filename(path):
+        """row_N.json holds row N - 1 of cleaned_movies.csv (see split_to_json.py)"""
+        match = re.fullmatch(r"row_(\d+)", Path(path).stem)
+        return int(match.group(1)) - 1 if match else None
+
     def preprocess_text(self, text, is_date=False):
         """Clean and tokenize with spaCy + lemmatization"""
         if pd.isna(text):
@@ -104,46 +355,111 @@ class SmartSearchEngine:
 
         # For dates, extract year (format: YYYY-MM-DD or just YYYY)
         if is_date:
-            year_match = re.findall(r"\b(?:19|20)\d{2}\b", text)
-            return year_match if year_match else []
-
-        # Process with spaCy
-        doc = self.nlp(text)
-
-        # Extract lemmas with spaCy's built-in stopwords
-        tokens = [
-            token.lemma_
-            for token in doc
-            if not token.is_stop  # spaCy's built-in stopwords
-            and not token.is_punct  # Remove punctuation
-            and not token.is_space  # Remove whitespace
-            and len(token.lemma_) > 2  # Remove short tokens
-            and token.is_alpha  # Keep only alphabetic tokens
-        ]
+            return year_tokens(text)
+
+        # Process with spaCy (memoized per text)
+        return list(self.analyze(text))
 
+    def _analyze_text(self, text):
+        return tuple(self.doc_tokens(self.nlp(text)))
+
+    def lookup_tokens(self, text):
+        """
+        Tokenizer-only analysis: lemmas come from the table learned at index
+        time, for surface forms that always got the same lemma while indexing.
+        A query with an unseen or ambiguous form (lemma depends on context)
+        falls back to the full pipeline. Filtering rules are the same as doc_tokens().
+        """
+        if pd.isna(text):
+            return []
+
+        tokens = []
+        for token in self.nlp.tokenizer(str(text).lower()):
+            if token.is_stop or token.is_punct or token.is_space or not token.is_alpha:
+                continue
+            lemma = self.lemma_table.get(token.lower_)
+            if lemma is None:
+                return self.preprocess_text(text)
+            if len(lemma) > 2:
+                tokens.append(lemma)
         return tokens
 
-    def build_index(self):
-        """Build inverted index by field"""
+    def analyze_query(self, query):
+        """Query lemmas with the configured analyzer"""
+        if self.analyzer == "lookup" and self.lemma_table:
+            return self.lookup_tokens(query)
+        return self.preprocess_text(query)
+
+    def preprocess_many(self, texts, batch_size=256):
+        """preprocess_text() for many texts at once, through nlp.pipe"""
+        tokens = [[] for _ in texts]
+        todo = [(i, str(text).lower()) for i, text in enumerate(texts) if not pd.isna(text)]
+
+        docs = self.nlp.pipe((text for _, text in todo), batch_size=batch_size)
+        for (i, _), doc in zip(todo, docs):
+            tokens[i] = self.doc_tokens(doc)
+
+        return tokens
+
+    @staticmethod
+    def doc_tokens(doc):
+        """Lemmas kept from a spaCy doc"""
+        return lemma_tokens(doc)
+
+    def build_index(self, n_process=1, shard_size=SHARD_SIZE, batch_size=BUILD_BATCH_SIZE):
+        """
+        Build inverted index by field.
+        Documents are split into shards analyzed with nlp.pipe, in a pool of
+        n_process workers when n_process > 1. Partial indexes are merged in
+        shard order, so postings stay sorted by document.
+        """
         print("Building inverted index...")
 
         for field in self.fields:
             self.doc_lengths[field] = {}
             self.avg_doc_length[field] = 0
 
-        for idx, row in self.df.iterrows():
-            for field in self.fields:
-                # Special treatment for dates
-                is_date_field = field == "Release_Date"
-                tokens = self.preprocess_text(row[field], is_date=is_date_field)
-                self.doc_lengths[field][idx] = len(tokens)
+        rows = list(zip(self.df.index, self.df[self.fields].to_dict("records")))
+        shards = [
+            (self.fields, rows[start:start + shard_size], batch_size)
+            for start in range(0, len(rows), shard_size)
+        ]
 
-                term_freq = defaultdict(int)
-                for token in tokens:
-                    term_freq[token] += 1
+        self.recognition_tokens = {
+            "directors_set": set(),
+            "genres_set": set(),
+            "title_words": set(),
+            "years_set": set(),
+        }
+        lemma_counts = defaultdict(Counter)
 
-                for term, freq in term_freq.items():
-                    self.inverted_index[field][term].append((idx, freq))
+        pool = None
+        if n_process > 1 and len(shards) > 1:
+            print(f"Using {n_process} worker processes for {len(shards)} shards")
+            pool = ProcessPoolExecutor(max_workers=n_process, initializer=_init_build_worker)
+            partials = pool.map(_build_shard_worker, shards)
+        else:
+            partials = (build_shard(self.nlp, *shard) for shard in shards)
+
+        try:
+            for done, partial in enumerate(partials, 1):
+                for field in self.fields:
+                    field_index = self.inverted_index[field]
+                    for term, postings in partial["index"][field].items():
+                        field_index[term].extend(postings)
+                    self.doc_lengths[field].update(partial["doc_lengths"][field])
+                for name, terms in partial["recognition"].items():
+                    self.recognition_tokens[name].update(terms)
+                for surface, lemmas in partial["lemma_counts"].items():
+                    lemma_counts[surface].update(lemmas)
+                if len(shards) > 1:
+                    print(f"  shard {done}/{len(shards)} merged")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        # Lemma of each surface form (lookup analyzer)
+        self.lemma_table = build_lemma_table(lemma_counts)
 
         for field in self.fields:
             if self.doc_lengths[field]:
@@ -154,29 +470,18 @@ class SmartSearchEngine:
         print(f"Index built: {len(self.df)} documents indexed")
 
     def build_recognition_dicts(self):
-        """Build dictionaries to automatically recognize terms"""
+        """
+        Build dictionaries to automatically recognize terms.
+        Reuses the director, genre, title and year tokens computed by build_index().
+        """
         print("Building recognition dictionaries...")
 
-        # Extract all directors
-        for director in self.df["Director"].dropna().unique():
-            tokens = self.preprocess_text(director)
-            self.directors_set.update(tokens)
-
-        # Extract all genres
-        for genres in self.df["Genres"].dropna():
-            for genre in str(genres).split(","):
-                tokens = self.preprocess_text(genre.strip())
-                self.genres_set.update(tokens)
-
-        # Extract important words from titles
-        for title in self.df["Title"].dropna():
-            tokens = self.preprocess_text(title)
-            self.title_words.update(tokens)
-
-        # Extract all years from release dates
-        for date in self.df["Release_Date"].dropna():
-            years = self.preprocess_text(date, is_date=True)
-            self.years_set.update(years)
+        tokens = self.recognition_tokens
+        self.directors_set.update(tokens["directors_set"])
+        self.genres_set.update(tokens["genres_set"])
+        self.title_words.update(tokens["title_words"])
+        self.years_set.update(tokens["years_set"])
+        self.recognition_tokens = None
 
         print(f"Unique directors: {len(self.directors_set)}")
         print(f"Unique genres: {len(self.genres_set)}")
@@ -209,24 +514,82 @@ class SmartSearchEngine:
 
         return classified
 
+    def prepare_scoring(self, k1=1.5, b=0.75):
+        """Build the scoring state used by search and publish it"""
+        self.scoring = self.build_scoring(k1, b)
+
+    def build_scoring(self, k1=1.5, b=0.75):
+        """Precompute posting lookups, IDF and length norms into a ScoringState"""
+        if self.index_store is not None:
+            # Postings are decoded lazily from the memory-mapped store
+            postings = self.index_store.field_postings
+            idf = self.index_store.field_idf
+        else:
+            if self.base_scoring is None:
+                self.base_scoring = self.build_base_scoring()
+            postings, idf = self.base_scoring
+
+        if self.segment is not None or self.tombstones:
+            # Added and deleted movies are merged into the base postings on
+            # lookup. The segment and tombstones keep changing with updates, so
+            # the state gets its own copy of them.
+            tombstones = frozenset(self.tombstones)
+            delta = {}
+            if self.segment is not None:
+                delta = {
+                    field: {term: dict(term_postings) for term, term_postings in terms.items()}
+                    for field, terms in self.segment["index"].items()
+                }
+            postings = {
+                field: SegmentedPostings(postings[field], delta.get(field, {}), tombstones)
+                for field in self.fields
+            }
+            idf = {field: SegmentedIdf(postings[field], self.N) for field in self.fields}
+
+        length_norm = {}
+        for field in self.fields:
+            avg_len = self.avg_doc_length.get(field, 0)
+            lengths = self.doc_lengths[field]
+            if not avg_len:
+                length_norm[field] = None
+            elif isinstance(lengths, np.ndarray):
+                length_norm[field] = k1 * (1 - b + b * (lengths / avg_len))
+            else:
+                # k1 * (1 - b + b * dl / avgdl), the document part of the BM25 denominator
+                length_norm[field] = {
+                    doc_id: k1 * (1 - b + b * (doc_len / avg_len))
+                    for doc_id, doc_len in lengths.items()
+                }
+        return ScoringState(k1, b, postings, idf, length_norm, self.df)
+
+    def build_base_scoring(self):
+        """term -> {doc_id: tf} and term -> idf of the in-memory inverted index"""
+        postings = {}
+        idf = {}
+        for field in self.fields:
+            terms = self.inverted_index[field]
+
+            # term -> {doc_id: tf} for O(1) tf lookups
+            postings[field] = {
+                term: dict(term_postings) for term, term_postings in terms.items()
+            }
+            idf[field] = {
+                term: math.log((self.N - len(term_postings) + 0.5) / (len(term_postings) + 0.5) + 1.0)
+                for term, term_postings in terms.items()
+            }
+        return postings, idf
+
     def bm25_score(self, term, doc_id, field, k1=1.5, b=0.75):
         """Calculate BM25 score for a term in a document"""
-        if term not in self.inverted_index[field]:
-            return 0.0
-
-        tf = 0
-        for doc, freq in self.inverted_index[field][term]:
-            if doc == doc_id:
-                tf = freq
-                break
+        scoring = self.scoring
+        tf = scoring.postings[field].get(term, {}).get(doc_id, 0)
 
         if tf == 0:
             return 0.0
 
-        df = len(self.inverted_index[field][term])
-        idf = math.log((self.N - df + 0.5) / (df + 0.5) + 1.0)
+        idf = scoring.idf[field][term]
 
-        doc_len = self.doc_lengths[field].get(doc_id, 0)
+        doc_len = self.doc_lengths[field][doc_id]
         avg_len = self.avg_doc_length[field]
 
         if avg_len == 0:
@@ -237,20 +600,202 @@ class SmartSearchEngine:
 
         return score
 
-    def search(self, query, top_n=10):
-        """Smart search with automatic term classification"""
+    def max_score(self, term, field, scoring=None):
+        """Upper bound of the BM25 contribution of a term in a field (cached)"""
+        scoring = scoring or self.scoring
+        key = (field, term)
+        bound = scoring.max_scores.get(key)
+        if bound is None:
+            k1 = scoring.k1
+            postings = scoring.postings[field].get(term)
+            norms = scoring.length_norm[field]
+            if not postings or norms is None:
+                bound = 0.0
+            else:
+                idf = scoring.idf[field][term]
+                bound = max(
+                    idf * (tf * (k1 + 1)) / (tf + norms[doc_id])
+                    for doc_id, tf in postings.items()
+                )
+            scoring.max_scores[key] = bound
+        return bound
+
+    def collect_candidates(self, candidate_pairs, scoring=None):
+        """Union of the posting lists of the (term, field) pairs"""
+        scoring = scoring or self.scoring
+        candidate_docs = set()
+        for term, field in candidate_pairs:
+            postings = scoring.postings[field].get(term)
+            if postings:
+                for doc_id in postings:
+                    candidate_docs.add(doc_id)
+        return candidate_docs
+
+    def score_candidates(self, scoring_plan, candidate_docs, scoring=None):
+        """
+        Term-at-a-time BM25 scoring.
+        Each (term, field) posting list of the plan is walked once and its
+        contribution is added to the accumulator of every candidate it hits.
+        Contributions are added in plan order, so totals match bm25_score().
+        """
+        scoring = scoring or self.scoring
+        k1 = scoring.k1
+        scores = {doc_id: 0.0 for doc_id in candidate_docs}
+
+        for term, field in scoring_plan:
+            postings = scoring.postings[field].get(term)
+            norms = scoring.length_norm[field]
+            if not postings or norms is None:
+                continue
+
+            idf = scoring.idf[field][term]
+
+            # Walk whichever side is shorter: the posting list or the candidates
+            if len(postings) <= len(scores):
+                hits = ((doc_id, tf) for doc_id, tf in postings.items() if doc_id in scores)
+            else:
+                hits = ((doc_id, postings[doc_id]) for doc_id in scores if doc_id in postings)
+
+            for doc_id, tf in hits:
+                scores[doc_id] += idf * (tf * (k1 + 1)) / (tf + norms[doc_id])
+
+        return scores
+
+    def get_filter_index(self, scoring=None):
+        """Filter masks over the documents (doc_id == row position)"""
+        scoring = scoring or self.scoring
+        if scoring.filter_index is None:
+            scoring.filter_index = FilterIndex(scoring.df.to_dict("records"))
+        return scoring.filter_index
+
+    def top_k(self, scoring_plan, candidate_pairs, top_n, allowed=None, scoring=None):
+        """
+        Top-k BM25 retrieval with MaxScore pruning.
+        Posting lists are processed by decreasing score upper bound. Once the
+        lists left cannot lift an unseen document past the current k-th best
+        partial score, no new candidates are admitted and candidates that can
+        no longer reach the top-k are dropped. Survivors get their exact score
+        from score_candidates(), so scores are unchanged; ties go to the lower doc id.
+        allowed is an optional boolean mask: other documents are never admitted.
+        """
+        if top_n <= 0:
+            return []
+
+        allowed = allowed.tolist() if allowed is not None else None
+
+        scoring = scoring or self.scoring
+        k1 = scoring.k1
+        generating = set(candidate_pairs)
+        lists = []
+        for term, field in scoring_plan:
+            postings = scoring.postings[field].get(term)
+            if not postings or scoring.length_norm[field] is None:
+                continue
+            lists.append(
+                (term, field, postings, self.max_score(term, field, scoring), (term, field) in generating)
+            )
+
+        # Candidate-generating lists first, each group by decreasing upper bound
+        lists.sort(key=lambda entry: (not entry[4], -entry[3]))
+        remaining = sum(entry[3] for entry in lists)
+
+        accumulators = {}
+        admitting = True
+        for term, field, postings, bound, generates in lists:
+            remaining -= bound
+            idf = scoring.idf[field][term]
+            norms = scoring.length_norm[field]
+
+            if admitting and generates:
+                for doc_id, tf in postings.items():
+                    if allowed is not None and not allowed[doc_id]:
+                        continue
+                    accumulators[doc_id] = accumulators.get(doc_id, 0.0) + (
+                        idf * (tf * (k1 + 1)) / (tf + norms[doc_id])
+                    )
+            else:
+                if len(postings) <= len(accumulators):
+                    hits = [(doc_id, tf) for doc_id, tf in postings.items() if doc_id in accumulators]
+                else:
+                    hits = [(doc_id, postings[doc_id]) for doc_id in accumulators if doc_id in postings]
+                for doc_id, tf in hits:
+                    accumulators[doc_id] += idf * (tf * (k1 + 1)) / (tf + norms[doc_id])
+
+            if len(accumulators) < top_n:
+                continue
+
+            # k-th best partial score: a lower bound of the final k-th best score
+            threshold = heapq.nlargest(top_n, accumulators.values())[-1]
+            if admitting and remaining + PRUNING_EPSILON < threshold:
+                admitting = False
+            if not admitting:
+                accumulators = {
+                    doc_id: score
+                    for doc_id, score in accumulators.items()
+                    if score + remaining + PRUNING_EPSILON >= threshold
+                }
+
+        scores = self.score_candidates(scoring_plan, sorted(accumulators), scoring)
+        return heapq.nlargest(top_n, scores.items(), key=lambda x: x[1])
+
+    def search(self, query, top_n=10, pruning=True, filters=None):
+        """
+        Smart search with automatic term classification.
+        pruning=False scores every candidate instead of using top_k().
+        filters (see filter_index.FILTER_KEYS) restrict scoring to matching documents.
+        """
         # Extract years BEFORE preprocessing
         years_in_query = re.findall(r"\b(?:19|20)\d{2}\b", query)
 
         # Tokenize query with spaCy + lemmatization
-        query_tokens = self.preprocess_text(query)
+        query_tokens = self.analyze_query(query)
 
         # Add extracted years to tokens
         query_tokens.extend(years_in_query)
 
+        return self.search_tokens(query_tokens, top_n=top_n, pruning=pruning, filters=filters)
+
+    def search_page(self, query, offset=0, limit=PAGE_SIZE, filters=None, cursor=None, postprocess=None):
+        """
+        Cursor-based pagination: the first call ranks up to MAX_RESULTS movies
+        and keeps them server-side (see pagination.py); pass the returned cursor
+        back with the next offset to fetch the following pages.
+        postprocess(results) may re-order the candidates once (e.g. re-ranking).
+        """
+        def compute():
+            results = self.search(query, top_n=MAX_RESULTS, filters=filters)
+            return postprocess(results) if postprocess else results
+
+        return cursor_store.search_page(compute, offset, limit, cursor)
+
+    def search_many(self, queries, top_n=10, pruning=True, filters=None):
+        """
+        Batched search(): all queries are tokenized in one nlp.pipe pass.
+        Returns one results DataFrame per query, in order.
+        """
+        queries = list(queries)
+        if self.analyzer == "lookup" and self.lemma_table:
+            all_tokens = [self.lookup_tokens(query) for query in queries]
+        else:
+            all_tokens = self.preprocess_many(queries)
+
+        results = []
+        for query, query_tokens in zip(queries, all_tokens):
+            query_tokens.extend(re.findall(r"\b(?:19|20)\d{2}\b", query))
+            results.append(
+                self.search_tokens(query_tokens, top_n=top_n, pruning=pruning, filters=filters)
+            )
+        return results
+
+    def search_tokens(self, query_tokens, top_n=10, pruning=True, filters=None):
+        """Rank documents for already tokenized query terms"""
         if not query_tokens:
             return pd.DataFrame()
 
+        # One consistent index state for the whole query, even if an update
+        # publishes a new one meanwhile
+        scoring = self.scoring
+
         # Classify query terms
         classified = self.classify_query_terms(query_tokens)
 
@@ -260,9 +805,6 @@ class SmartSearchEngine:
             if terms:
                 print(f"{category.capitalize()}: {terms}")
 
-        # Collect all candidate documents
-        candidate_docs = set()
-
         # Search terms in their corresponding fields
         field_mapping = {
             "director": ["Director"],
@@ -272,55 +814,44 @@ class SmartSearchEngine:
             "general": ["Title", "Director", "Genres", "Overview"],
         }
 
-        for category, terms in classified.items():
-            target_fields = field_mapping[category]
-            for term in terms:
-                for field in target_fields:
-                    if term in self.inverted_index[field]:
-                        for doc_id, _ in self.inverted_index[field][term]:
-                            candidate_docs.add(doc_id)
-
-        # Calculate scores for each document
-        scores = {}
-        for doc_id in candidate_docs:
-            total_score = 0.0
-
-            # Score for director terms
-            for term in classified["director"]:
-                score = self.bm25_score(term, doc_id, "Director")
-                total_score += score * 1.0
-
-            # Score for genre terms
-            for term in classified["genre"]:
-                score = self.bm25_score(term, doc_id, "Genres")
-                total_score += score * 1.0
-
-            # Score for title terms
-            for term in classified["title"]:
-                score = self.bm25_score(term, doc_id, "Title")
-                total_score += score * 1.0
-
-            # Score for years
-            for term in classified["year"]:
-                score = self.bm25_score(term, doc_id, "Release_Date")
-                total_score += score * 1.0
-
-            # Score for general terms
-            for term in classified["general"]:
-                for field in [
-                    "Title",
-                    "Director",
-                    "Genres",
-                    "Overview",
-                    "Release_Date",
-                ]:
-                    score = self.bm25_score(term, doc_id, field)
-                    total_score += score * 1.0
-
-            scores[doc_id] = total_score
-
-        # Sort by descending score
-        sorted_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
+        # Pairs whose postings bring in candidate documents
+        candidate_pairs = [
+            (term, field)
+            for category, terms in classified.items()
+            for term in terms
+            for field in field_mapping[category]
+        ]
+
+        # Fields scored for each category (general terms also score the year field)
+        scoring_fields = dict(field_mapping)
+        scoring_fields["general"] = [
+            "Title",
+            "Director",
+            "Genres",
+            "Overview",
+            "Release_Date",
+        ]
+
+        scoring_plan = [
+            (term, field)
+            for category in ["director", "genre", "title", "year", "general"]
+            for term in classified[category]
+            for field in scoring_fields[category]
+        ]
+
+        allowed = self.get_filter_index(scoring).mask(filters) if filters else None
+
+        if pruning:
+            sorted_docs = self.top_k(scoring_plan, candidate_pairs, top_n, allowed, scoring)
+        else:
+            # Calculate scores for each document
+            candidate_docs = self.collect_candidates(candidate_pairs, scoring)
+            if allowed is not None:
+                candidate_docs = {doc_id for doc_id in candidate_docs if allowed[doc_id]}
+            scores = self.score_candidates(scoring_plan, candidate_docs, scoring)
+
+            # Sort by descending score
+            sorted_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_n]
 
         if not sorted_docs:
             return pd.DataFrame()
@@ -328,15 +859,254 @@ class SmartSearchEngine:
         result_indices = [doc_id for doc_id, _ in sorted_docs]
         result_scores = [score for _, score in sorted_docs]
 
-        results = self.df.loc[
-            result_indices, ["Title", "Overview", "Genres", "Director", "Release_Date"]
+        results = scoring.df.loc[
+            result_indices,
+            ["Doc_Id", "Title", "Overview", "Genres", "Director", "Release_Date"],
         ].copy()
         results["score"] = result_scores
 
         return results.reset_index(drop=True)
 
+    def add_documents(self, records):
+        """
+        Index new movies without a rebuild: only these records are analyzed.
+        Returns their Doc_Ids (numbered after the largest one when missing).
+        Changes stay in memory until save_segments() writes them; a serving
+        process then reloads the index within smart_search_loader.STALE_CHECK_INTERVAL.
+        """
+        with self._update_lock:
+            doc_ids = self._add_documents(records)
+            self.refresh_scoring()
+        return doc_ids
+
+    def update_document(self, doc_id, record):
+        """Replace a movie: its current version is tombstoned and the new one indexed"""
+        with self._update_lock:
+            internal_id = self.internal_id(doc_id)
+            self.tombstones.add(internal_id)
+            self._add_documents([{**record, "Doc_Id": doc_id}])
+            self.refresh_scoring()
+            self.prune_recognition_sets([internal_id])
+
+    def delete_document(self, doc_id):
+        """Tombstone a movie by Doc_Id (KeyError if it is not indexed)"""
+        with self._update_lock:
+            internal_id = self.internal_id(doc_id)
+            self.tombstones.add(internal_id)
+            self.refresh_scoring()
+            self.prune_recognition_sets([internal_id])
+
+    def internal_id(self, doc_id):
+        """Row (== internal doc id) of the live movie with this Doc_Id"""
+        rows = np.flatnonzero((self.df["Doc_Id"] == doc_id).to_numpy())
+        for row in rows[::-1]:
+            if int(row) not in self.tombstones:
+                return int(row)
+        raise KeyError(doc_id)
+
+    def _add_documents(self, records):
+        records = [dict(record) for record in records]
+        if not records:
+            return []
+
+        next_doc_id = int(self.df["Doc_Id"].max()) + 1 if len(self.df) else 0
+        for record in records:
+            if record.get("Doc_Id") is None:
+                record["Doc_Id"] = next_doc_id
+                next_doc_id += 1
+
+        internal_ids = list(range(len(self.df), len(self.df) + len(records)))
+        rows = [
+            (internal_id, {field: record.get(field) for field in self.fields})
+            for internal_id, record in zip(internal_ids, records)
+        ]
+        segment = build_shard(self.nlp, self.fields, rows)
+        segment["lemma_table"] = build_lemma_table(segment.pop("lemma_counts"))
+        segment["doc_ids"] = internal_ids
+        segment["records"] = records
+
+        self.apply_segment(segment)
+        self.pending_segments.append(segment)
+        return [record["Doc_Id"] for record in records]
+
+    def apply_segment(self, segment):
+        """Append an added segment to the in-memory one (its ids must follow the current rows)"""
+        if segment["doc_ids"] and segment["doc_ids"][0] != len(self.df):
+            raise ValueError(
+                f"Segment starts at doc {segment['doc_ids'][0]}, index has {len(self.df)} documents"
+            )
+
+        if self.segment is None:
+            self.segment = {
+                "doc_ids": [],
+                "records": [],
+                "index": {field: defaultdict(dict) for field in self.fields},
+                "recognition": {name: set() for name in RECOGNITION_FIELDS},
+                "lemma_table": {},
+            }
+        merged = self.segment
+        merged["doc_ids"].extend(segment["doc_ids"])
+        merged["records"].extend(segment["records"])
+
+        for field in self.fields:
+            for term, postings in segment["index"].get(field, {}).items():
+                merged["index"][field][term].update(postings)
+
+            lengths = segment["doc_lengths"].get(field, {})
+            if isinstance(self.doc_lengths[field], np.ndarray):
+                added = np.array(
+                    [lengths.get(doc_id, 0) for doc_id in segment["doc_ids"]],
+                    dtype=self.doc_lengths[field].dtype,
+                )
+                self.doc_lengths[field] = np.concatenate([self.doc_lengths[field], added])
+            else:
+                self.doc_lengths[field].update(lengths)
+
+        for name, terms in segment["recognition"].items():
+            merged["recognition"][name].update(terms)
+            getattr(self, name).update(terms)
+            self.removed_terms.get(name, set()).difference_update(terms)
+
+        for surface, lemma in segment["lemma_table"].items():
+            merge_lemma(merged["lemma_table"], surface, lemma)
+            merge_lemma(self.lemma_table, surface, lemma)
+
+        self.df = pd.concat([self.df, pd.DataFrame(segment["records"], index=segment["doc_ids"])])
+
+    def prune_recognition_sets(self, internal_ids):
+        """
+        Drop the recognition terms of deleted movies that no live movie uses
+        anymore. A term stays while its field still has live postings for it.
+        """
+        rows = [
+            (internal_id, {field: self.df.iloc[internal_id][field] for field in self.fields})
+            for internal_id in internal_ids
+        ]
+        recognition = build_shard(self.nlp, self.fields, rows)["recognition"]
+        for name, terms in recognition.items():
+            postings = self.scoring.postings[RECOGNITION_FIELDS[name]]
+            for term in terms:
+                if not postings.get(term):
+                    getattr(self, name).discard(term)
+                    self.removed_terms.setdefault(name, set()).add(term)
+
+    def update_collection_stats(self):
+        """N and average field lengths over the live movies"""
+        self.N = len(self.df) - len(self.tombstones)
+        deleted = np.fromiter(self.tombstones, dtype=np.int64, count=len(self.tombstones))
+
+        for field in self.fields:
+            lengths = self.doc_lengths[field]
+            if isinstance(lengths, np.ndarray):
+                live = np.ones(len(lengths), dtype=bool)
+                live[deleted[deleted < len(lengths)]] = False
+                values = lengths[live]
+            else:
+                values = [length for doc_id, length in lengths.items() if doc_id not in self.tombstones]
+            self.avg_doc_length[field] = np.mean(values) if len(values) else 0
+
+    def refresh_scoring(self):
+        """Recompute statistics, scoring tables and filters after an update"""
+        self.update_collection_stats()
+        self.prepare_scoring(self.scoring.k1, self.scoring.b)
+        self.generation += 1
+
+    def cache_version(self):
+        """Version of the searched index, part of the result cache key"""
+        return f"{self.data_version}:{self.generation}"
+
+    def has_updates(self):
+        return self.segment is not None or bool(self.tombstones)
+
+    def live_documents(self):
+        """Rows of the movies that are not deleted"""
+        return self.df[~self.df.index.isin(list(self.tombstones))]
+
+    def save_segments(self, folder_path="../../data/index_data"):
+        """Write added movies as new segment files, plus tombstones and facets"""
+        with self._update_lock:
+            for segment in self.pending_segments:
+                write_segment(folder_path, segment)
+            self.pending_segments = []
+            write_tombstones(folder_path, self.tombstones, self.removed_terms)
+            save_facets(build_facets(self.live_documents()), folder_path)
+
+        print(f"✓ Segments saved: {len(segment_paths(folder_path))} segment(s), "
+              f"{len(self.tombstones)} deleted movie(s)")
+
+    def merge_segments(self, folder_path="../../data/index_data"):
+        """
+        Compaction: rewrite every segment file as a single one, without the
+        postings of deleted movies. Records are kept so internal ids stay stable.
+        """
+        with self._update_lock:
+            if self.segment is None:
+                return
+            merged = self.segment
+            old_paths = segment_paths(folder_path)
+
+            index = {}
+            for field, terms in merged["index"].items():
+                index[field] = {}
+                for term, postings in terms.items():
+                    live = [(doc_id, tf) for doc_id, tf in postings.items() if doc_id not in self.tombstones]
+                    if live:
+                        index[field][term] = live
+
+            doc_lengths = {
+                field: {doc_id: int(self.doc_lengths[field][doc_id]) for doc_id in merged["doc_ids"]}
+                for field in self.fields
+            }
+            number = int(os.path.basename(old_paths[-1])[8:-5]) + 1 if old_paths else 1
+            write_segment(
+                folder_path,
+                {**merged, "index": index, "doc_lengths": doc_lengths},
+                number=number,
+            )
+            for path in old_paths:
+                os.remove(path)
+            self.pending_segments = []
+            write_tombstones(folder_path, self.tombstones, self.removed_terms)
+
+        print(f"✓ {len(old_paths)} segment(s) merged")
+
+    def merge_segments_async(self, folder_path="../../data/index_data"):
+        """Run merge_segments() in a background thread; updates wait for it, searches do not"""
+        thread = threading.Thread(
+            target=self.merge_segments, args=(folder_path,), name="segment-merge", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def load_segments(self, folder_path):
+        """Apply the segments and tombstones saved next to the index"""
+        paths = segment_paths(folder_path)
+        tombstones, removed_terms = read_tombstones(folder_path)
+        if not paths and not tombstones:
+            return
+
+        for path in paths:
+            segment = read_segment(path)
+            # A merged segment written before its sources were removed
+            if segment["doc_ids"] and segment["doc_ids"][0] < len(self.df):
+                continue
+            self.apply_segment(segment)
+
+        self.tombstones = tombstones
+        self.removed_terms = removed_terms
+        for name, terms in removed_terms.items():
+            getattr(self, name).difference_update(terms)
+        self.update_collection_stats()
+
+        print(f"✓ {len(paths)} segment(s) and {len(tombstones)} deleted movie(s) applied")
+
     def save_index(self, folder_path="../../data/index_data"):
         """Save inverted index and metadata to JSON"""
+        if self.index_store is not None:
+            raise ValueError("Index was loaded from binary format; use save_index_binary()")
+        if self.has_updates():
+            raise ValueError("Index has incremental updates; use save_segments() or rebuild it")
+
         os.makedirs(folder_path, exist_ok=True)
 
         print(f"\nSaving index to '{folder_path}'...")
@@ -368,12 +1138,19 @@ class SmartSearchEngine:
             "title_words": list(self.title_words),
             "years_set": list(self.years_set),
             "fields": self.fields,
+            "lemma_table": self.lemma_table,
+            "doc_ids": self.base_doc_ids(),
         }
 
         metadata_path = os.path.join(folder_path, "metadata.json")
         with open(metadata_path, "w", encoding="utf-8") as f:
             json.dump(metadata, f, ensure_ascii=False, indent=2)
 
+        # Facet table for the UI filters (genres, years, directors, cast)
+        save_facets(build_facets(self.df), folder_path)
+        # Segments of the previous index are folded into this one
+        clear_segments(folder_path)
+
         # Display stats
         index_size = os.path.getsize(index_path) / 1024
         metadata_size = os.path.getsize(metadata_path) / 1024
@@ -384,9 +1161,62 @@ class SmartSearchEngine:
         print(f"  📄 metadata.json: {metadata_size:.2f} KB")
         print(f"  📊 Total: {index_size + metadata_size:.2f} KB")
 
+    def save_index_binary(self, folder_path="../../data/index_data"):
+        """Save the index in the compact memory-mappable format (see index_store)"""
+        if self.index_store is not None:
+            raise ValueError("Index is already stored in binary format")
+        if self.has_updates():
+            raise ValueError("Index has incremental updates; use save_segments() or rebuild it")
+
+        print(f"\nSaving binary index to '{folder_path}'...")
+        write_binary_index(
+            folder_path,
+            inverted_index=self.inverted_index,
+            doc_lengths=self.doc_lengths,
+            N=self.N,
+            fields=self.fields,
+            avg_doc_length=self.avg_doc_length,
+            recognition_sets={
+                "directors_set": self.directors_set,
+                "genres_set": self.genres_set,
+                "title_words": self.title_words,
+                "years_set": self.years_set,
+            },
+            lemma_table=self.lemma_table,
+            doc_ids=self.base_doc_ids(),
+        )
+        save_facets(build_facets(self.df), folder_path)
+        clear_segments(folder_path)
+        print("✓ Binary index saved successfully!")
+
+    def load_binary_index(self, folder_path):
+        """Memory-map an index saved with save_index_binary()"""
+        store = BinaryIndex(folder_path)
+
+        self.index_store = store
+        self.inverted_index = None
+        self.N = store.N
+        self.fields = store.fields
+        self.doc_lengths = store.doc_lengths
+        self.avg_doc_length = store.avg_doc_length
+        self.directors_set = store.recognition_sets["directors_set"]
+        self.genres_set = store.recognition_sets["genres_set"]
+        self.title_words = store.recognition_sets["title_words"]
+        self.years_set = store.recognition_sets["years_set"]
+        self.lemma_table = store.lemma_table
+
+        print("✓ Binary index mapped successfully!")
+
     def load_index(self, folder_path="../../data"):
-        """Load inverted index from JSON"""
+        """Load inverted index from the binary format if present, else from JSON"""
         print(f"\nLoading index from '{folder_path}'...")
+        self.data_version = folder_version(folder_path)
+
+        if is_binary_index(folder_path):
+            self.load_binary_index(folder_path)
+            self.align_documents(self.index_store.doc_ids)
+            self.load_segments(folder_path)
+            return
 
         index_path = os.path.join(folder_path, "inverted_index.json")
         metadata_path = os.path.join(folder_path, "metadata.json")
@@ -423,5 +1253,62 @@ class SmartSearchEngine:
         self.title_words = set(metadata["title_words"])
         self.years_set = set(metadata["years_set"])
         self.fields = metadata["fields"]
+        self.lemma_table = metadata.get("lemma_table", {})
 
         print(f"✓ Index loaded successfully!")
+        self.align_documents(metadata.get("doc_ids"))
+        self.load_segments(folder_path)
+
+    @staticmethod
+    def index_has_doc_ids(folder_path):
+        """True if the index in folder_path records the Doc_Id of each internal id"""
+        if is_binary_index(folder_path):
+            path = os.path.join(folder_path, HEADER_FILE)
+        else:
+            path = os.path.join(folder_path, "metadata.json")
+        if not os.path.exists(path):
+            return False
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("doc_ids") is not None
+
+    def base_doc_ids(self):
+        """Doc_Id of each internal doc id, or None if some movies have none"""
+        doc_ids = self.df["Doc_Id"]
+        if doc_ids.isna().any():
+            return None
+        return [int(doc_id) for doc_id in doc_ids]
+
+    def align_documents(self, doc_ids):
+        """
+        Reorder the DataFrame so row i is internal doc i of the loaded index,
+        whichever order the documents were read in (JSON folder or store).
+        An index saved without doc_ids only matches its documents in the order
+        they were read when it was built (JSON folder glob order, or the df).
+        """
+        if doc_ids is None:
+            if self.documents_source == "store":
+                raise ValueError(
+                    "Index saved without doc_ids: its internal ids only match the JSON "
+                    "folder it was built from; load it with json_folder or rebuild the index"
+                )
+            return
+        if self.df["Doc_Id"].tolist() == list(doc_ids):
+            return
+        by_doc_id = self.df.set_index("Doc_Id", drop=False)
+        missing = set(doc_ids) - set(by_doc_id.index)
+        if missing:
+            raise ValueError(f"{len(missing)} indexed movies are missing from the documents; rebuild the index")
+        self.df = by_doc_id.loc[list(doc_ids)].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # python -m src.classification_search.smart_search_engine data/documents.jsonl data/index_data [workers]
+    source = sys.argv[1] if len(sys.argv) > 1 else "data/documents.jsonl"
+    index_folder = sys.argv[2] if len(sys.argv) > 2 else "data/index_data"
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+
+    if source.endswith(".jsonl"):
+        engine = SmartSearchEngine(documents_path=source, n_process=workers)
+    else:
+        engine = SmartSearchEngine(json_folder=source, n_process=workers)
+    engine.save_index(index_folder)
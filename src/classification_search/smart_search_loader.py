@@ -1,35 +1,134 @@
-from .smart_search_engine import SmartSearchEngine 
+from .smart_search_engine import SmartSearchEngine
+from ..common.pagination import MAX_RESULTS, PAGE_SIZE, cursor_store
+from ..common.result_cache import folder_version, result_cache
 import pandas as pd
 import os
+import time
+import threading
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 INDEX_FOLDER = os.path.join(BASE_DIR, "../../data/index_data")
 JSON_FOLDER = os.path.join(BASE_DIR, "../../data/Docs")
+# Consolidated document store (split_to_json.py); JSON_FOLDER is the legacy layout
+DOCUMENTS_PATH = os.path.join(BASE_DIR, "../../data/documents.jsonl")
 
+# Seconds between two checks of the index on disk; a rebuilt or updated
+# index is then reloaded in the background
+STALE_CHECK_INTERVAL = 5.0
 
-def load_engine():
+# One warm engine per process, shared by every caller (Streamlit sessions run
+# in threads of the same process). The lock only guards creation and swaps;
+# searches run on whatever engine reference they picked up.
+_engine = None
+_engine_version = None
+_engine_lock = threading.Lock()
+_last_check = 0.0
+# Separate from _engine_lock, which reload_engine() holds while loading
+_reload_lock = threading.Lock()
+_reload_thread = None
+
+
+def load_engine(engine_class=SmartSearchEngine, analyzer="full"):
     """
     Load the SmartSearchEngine using an already saved index.
-    Only the JSON folder is needed to rebuild the DataFrame.
+    Only the document store (or the JSON folder) is needed to rebuild the DataFrame.
     The heavy index is loaded directly from disk.
+    engine_class can be SparseSearchEngine for vectorized scoring.
+    analyzer="lookup" skips the spaCy tagger for queries (see analyze_query).
     """
     print("Loading engine with pre-built index...")
-    engine = SmartSearchEngine(
-        json_folder=JSON_FOLDER,    # to load the dataframe
-        load_from_file=INDEX_FOLDER # to load the BM25 index
+    # Indexes saved without doc_ids (older builds) only line up with the JSON
+    # folder they were built from
+    if os.path.exists(DOCUMENTS_PATH) and engine_class.index_has_doc_ids(INDEX_FOLDER):
+        documents = {"documents_path": DOCUMENTS_PATH}
+    else:
+        documents = {"json_folder": JSON_FOLDER}
+    engine = engine_class(
+        **documents,                 # to load the dataframe
+        load_from_file=INDEX_FOLDER, # to load the BM25 index
+        analyzer=analyzer,
     )
     return engine
 
 
-def run_search(query, top_n=10):
-    engine = load_engine()
-    results = engine.search(query, top_n=top_n)
+def get_engine():
+    """
+    Return the process-wide engine, loading it on first use. Every
+    STALE_CHECK_INTERVAL seconds the index on disk is checked; if it was
+    rebuilt or got new segments, it is reloaded in a background thread and
+    swapped in when ready, while searches keep using the current engine.
+    """
+    global _engine, _engine_version, _last_check
+    engine = _engine
+    if engine is not None:
+        now = time.monotonic()
+        if now - _last_check >= STALE_CHECK_INTERVAL:
+            _last_check = now
+            if is_engine_stale():
+                reload_engine_async()
+        return engine
+
+    with _engine_lock:
+        # Another thread may have finished loading while we were waiting
+        if _engine is None:
+            version = folder_version(INDEX_FOLDER)
+            _engine = load_engine()
+            _engine_version = version
+            _last_check = time.monotonic()
+        return _engine
+
+
+def is_engine_stale():
+    """True if the index on disk changed since the engine was loaded"""
+    return _engine is not None and folder_version(INDEX_FOLDER) != _engine_version
+
+
+def reload_engine():
+    """
+    Reload the engine from disk and swap it in atomically.
+    In-flight searches keep using the previous engine until they finish.
+    """
+    global _engine, _engine_version
+    with _engine_lock:
+        version = folder_version(INDEX_FOLDER)
+        engine = load_engine()
+        _engine = engine
+        _engine_version = version
+    return engine
+
+
+def reload_engine_async():
+    """Start reload_engine() in a daemon thread unless one is already running"""
+    global _reload_thread
+    with _reload_lock:
+        if _reload_thread is None or not _reload_thread.is_alive():
+            _reload_thread = threading.Thread(target=reload_engine, name="bm25-reload", daemon=True)
+            _reload_thread.start()
+        return _reload_thread
+
+
+def run_search(query, top_n=10, filters=None):
+    """Search the process-wide engine; results are cached under its index version"""
+    engine = get_engine()
+    results = result_cache.get_or_compute(
+        "bm25", engine.cache_version(), query, top_n, filters,
+        lambda: engine.search(query, top_n=top_n, filters=filters),
+    )
     return results
 
 
+def run_search_page(query, offset=0, limit=PAGE_SIZE, filters=None, cursor=None, postprocess=None):
+    """Paginated run_search(): see SmartSearchEngine.search_page"""
+    def compute():
+        results = run_search(query, top_n=MAX_RESULTS, filters=filters)
+        return postprocess(results) if postprocess else results
+
+    return cursor_store.search_page(compute, offset, limit, cursor)
+
+
 if __name__ == "__main__":
     query = "batman"
     results = run_search(query, top_n=10)
 
     print("\n=== Search Results ===")
-    print(results[['Title', 'Director', 'Genres', 'Release_Date', 'score']])
\ No newline at end of file
+    print(results[['Title', 'Director', 'Genres', 'Release_Date', 'score']])
@@ -0,0 +1,117 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .smart_search_engine import SmartSearchEngine
+
+
+class SparseSearchEngine(SmartSearchEngine):
+    """
+    SmartSearchEngine variant that scores with NumPy instead of Python loops.
+
+    Every field is stored as a CSR matrix (terms x documents) holding the final
+    BM25 weight of each posting, document-length normalization included. A
+    query is then a sum of row slices into a dense score vector, followed by a
+    partial sort. Weights are computed with the same expression as bm25_score()
+    and rows are added in query-plan order, so scores are identical.
+    """
+
+    def __init__(self, *args, field_weights=None, **kwargs):
+        self.field_weights = field_weights or {}
+        super().__init__(*args, **kwargs)
+
+    def build_scoring(self, k1=1.5, b=0.75):
+        scoring = super().build_scoring(k1=k1, b=b)
+        self.build_weight_matrices(scoring)
+        return scoring
+
+    def build_weight_matrices(self, scoring):
+        """Precompute one CSR matrix of BM25 weights per field into the scoring state"""
+        print("Building BM25 weight matrices...")
+        k1 = scoring.k1
+        scoring.n_docs = max(
+            (len(lengths) if isinstance(lengths, np.ndarray) else max(lengths, default=-1) + 1)
+            for lengths in self.doc_lengths.values()
+        )
+        scoring.term_rows = {}
+        scoring.weight_matrices = {}
+
+        for field in self.fields:
+            norms = scoring.length_norm[field]
+            terms = list(scoring.postings[field]) if norms is not None else []
+            scoring.term_rows[field] = {term: row for row, term in enumerate(terms)}
+
+            indptr = [0]
+            doc_ids = []
+            tfs = []
+            idfs = []
+            for term in terms:
+                postings = scoring.postings[field][term]
+                doc_ids.extend(postings.keys())
+                tfs.extend(postings.values())
+                idfs.extend([scoring.idf[field][term]] * len(postings))
+                indptr.append(len(doc_ids))
+
+            doc_ids = np.asarray(doc_ids, dtype=np.int64)
+            tfs = np.asarray(tfs, dtype=np.float64)
+            idfs = np.asarray(idfs, dtype=np.float64)
+            if isinstance(norms, np.ndarray):
+                doc_norms = norms[doc_ids]
+            else:
+                doc_norms = np.asarray([norms[doc_id] for doc_id in doc_ids.tolist()], dtype=np.float64)
+
+            weights = idfs * (tfs * (k1 + 1)) / (tfs + doc_norms)
+            scoring.weight_matrices[field] = csr_matrix(
+                (weights, doc_ids, np.asarray(indptr, dtype=np.int64)),
+                shape=(len(terms), scoring.n_docs),
+            )
+
+    def plan_rows(self, pairs, scoring):
+        """(field, row) of each (term, field) pair present in the index"""
+        rows = []
+        for term, field in pairs:
+            row = scoring.term_rows[field].get(term)
+            if row is not None:
+                rows.append((field, row))
+        return rows
+
+    def top_k(self, scoring_plan, candidate_pairs, top_n, allowed=None, scoring=None):
+        """Vectorized top-k: row-slice sums over the weight matrices, then a partial sort"""
+        if top_n <= 0:
+            return []
+
+        scoring = scoring or self.scoring
+        n_docs = scoring.n_docs
+        candidates = np.zeros(n_docs, dtype=bool)
+        for field, row in self.plan_rows(candidate_pairs, scoring):
+            matrix = scoring.weight_matrices[field]
+            candidates[matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]] = True
+
+        if allowed is not None:
+            passing = np.zeros(n_docs, dtype=bool)
+            passing[: len(allowed)] = allowed[: n_docs]
+            candidates &= passing
+
+        candidate_ids = np.flatnonzero(candidates)
+        if candidate_ids.size == 0:
+            return []
+
+        scores = np.zeros(n_docs, dtype=np.float64)
+        for field, row in self.plan_rows(scoring_plan, scoring):
+            matrix = scoring.weight_matrices[field]
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            weight = self.field_weights.get(field, 1.0)
+            scores[matrix.indices[start:end]] += matrix.data[start:end] * weight
+
+        candidate_scores = scores[candidate_ids]
+        if top_n < candidate_ids.size:
+            # Keep everything tied with the k-th score so ties resolve by doc id
+            kth = np.partition(candidate_scores, -top_n)[-top_n]
+            keep = candidate_scores >= kth
+            candidate_ids = candidate_ids[keep]
+            candidate_scores = candidate_scores[keep]
+
+        order = np.lexsort((candidate_ids, -candidate_scores))[:top_n]
+        return [
+            (int(doc_id), float(score))
+            for doc_id, score in zip(candidate_ids[order], candidate_scores[order])
+        ]
@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+from pathlib import Path
+import numpy as np
+
+# Consolidated document store, replacing one row_N.json file per movie:
+#   documents.jsonl      one JSON movie per line, in Doc_Id (CSV row) order
+#   documents.jsonl.idx  .npy array of (Doc_Id, byte offset) per line
+# Reads stream line by line; get(doc_id) seeks straight to the movie.
+
+DOCUMENTS_PATH = "data/documents.jsonl"
+INDEX_SUFFIX = ".idx"
+CHUNK_SIZE = 5000
+
+
+class DocumentWriter:
+    """
+    Chunked writer: call write(records) any number of times, then close().
+    Files are written under temporary names and swapped in by close(), so
+    readers never see a half-written store.
+    """
+
+    def __init__(self, path=DOCUMENTS_PATH):
+        self.path = str(path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path + ".tmp", "wb")
+        self._entries = []
+        self._next_doc_id = 0
+
+    def write(self, records):
+        """Append records; missing Doc_Ids continue the running row number"""
+        for record in records:
+            doc_id = record.get("Doc_Id")
+            if doc_id is None:
+                doc_id = self._next_doc_id
+                record = {**record, "Doc_Id": doc_id}
+            self._next_doc_id = int(doc_id) + 1
+
+            self._entries.append((int(doc_id), self._file.tell()))
+            self._file.write(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+            self._file.write(b"\n")
+
+    def close(self):
+        self._file.close()
+        index = np.array(self._entries, dtype=np.int64).reshape(-1, 2)
+        with open(self.path + INDEX_SUFFIX + ".tmp", "wb") as f:
+            np.save(f, index)
+        os.replace(self.path + ".tmp", self.path)
+        os.replace(self.path + INDEX_SUFFIX + ".tmp", self.path + INDEX_SUFFIX)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self.path + ".tmp")
+
+
+class DocumentStore:
+    """Read side of a documents.jsonl store"""
+
+    def __init__(self, path=DOCUMENTS_PATH):
+        self.path = str(path)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Document store not found: {self.path}")
+
+        index = np.load(self.path + INDEX_SUFFIX)
+        self.doc_ids = index[:, 0]
+        self.offsets = index[:, 1]
+        # Doc_Id -> line lookups by binary search, whatever the file order
+        self._order = np.argsort(self.doc_ids, kind="stable")
+        self._sorted_ids = self.doc_ids[self._order]
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __iter__(self):
+        """Stream every movie in file order"""
+        with open(self.path, "rb") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        """Stream movies as lists of at most chunk_size records"""
+        chunk = []
+        for record in self:
+            chunk.append(record)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def line_of(self, doc_id):
+        sorted_ids = self._sorted_ids
+        pos = int(np.searchsorted(sorted_ids, doc_id))
+        if pos == len(sorted_ids) or sorted_ids[pos] != doc_id:
+            raise KeyError(doc_id)
+        return int(self._order[pos])
+
+    def get(self, doc_id):
+        """Random access to one movie by Doc_Id"""
+        with open(self.path, "rb") as f:
+            f.seek(int(self.offsets[self.line_of(doc_id)]))
+            return json.loads(f.readline())
+
+    def get_many(self, doc_ids):
+        """Movies for several Doc_Ids, in the given order (one open, sorted seeks)"""
+        lines = [self.line_of(doc_id) for doc_id in doc_ids]
+        records = {}
+        with open(self.path, "rb") as f:
+            for line in sorted(set(lines)):
+                f.seek(int(self.offsets[line]))
+                records[line] = json.loads(f.readline())
+        return [records[line] for line in lines]
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame(list(self))
+
+
+def convert_json_folder(json_folder, path=DOCUMENTS_PATH, chunk_size=CHUNK_SIZE):
+    """Migrate a folder of row_N.json files to the store, in Doc_Id order"""
+    files = []
+    for json_file in Path(json_folder).glob("row_*.json"):
+        files.append((int(json_file.stem[len("row_"):]) - 1, json_file))
+    files.sort()
+
+    with DocumentWriter(path) as writer:
+        for start in range(0, len(files), chunk_size):
+            records = []
+            for doc_id, json_file in files[start:start + chunk_size]:
+                with open(json_file, "r", encoding="utf-8") as f:
+                    records.append({**json.load(f), "Doc_Id": doc_id})
+            writer.write(records)
+    print(f"Document store écrit : {path} ({len(files)} films)")
+
+
+if __name__ == "__main__":
+    # python src/common/document_store.py data/Docs data/documents.jsonl
+    convert_json_folder(
+        sys.argv[1] if len(sys.argv) > 1 else "data/Docs",
+        sys.argv[2] if len(sys.argv) > 2 else DOCUMENTS_PATH,
+    )
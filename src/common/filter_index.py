@@ -0,0 +1,96 @@
+import math
+from functools import lru_cache
+import numpy as np
+
+# Filters understood by FilterIndex.mask(), as passed by app.py:
+#   genre       exact genre name ("Science Fiction")
+#   year        release year ("2010")
+#   min_rating  minimum Vote_Average
+#   runtime     (min, max) runtime in minutes, inclusive
+#   director    case-insensitive substring of Director
+#   actor       case-insensitive substring of Cast
+FILTER_KEYS = ["genre", "year", "min_rating", "runtime", "director", "actor"]
+
+
+def _to_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return value
+
+
+class FilterIndex:
+    """
+    Filter masks precomputed over a corpus, so engines can restrict scoring
+    to matching documents. Row i of the index is document i of the engine.
+    Genres and years are stored as one boolean mask per value, ratings and
+    runtimes as float arrays; text filters are cached per value.
+    """
+
+    def __init__(self, records):
+        records = list(records)
+        n = len(records)
+        self.size = n
+
+        self.genre_masks = {}
+        self.year_masks = {}
+        self.ratings = np.full(n, np.nan)
+        self.runtimes = np.full(n, np.nan)
+        directors = []
+        casts = []
+
+        for i, record in enumerate(records):
+            for genre in str(record.get("Genres") or "").split(","):
+                genre = genre.strip().lower()
+                if genre:
+                    self.genre_masks.setdefault(genre, np.zeros(n, dtype=bool))[i] = True
+
+            year = str(record.get("Release_Date") or "")[:4]
+            if year:
+                self.year_masks.setdefault(year, np.zeros(n, dtype=bool))[i] = True
+
+            self.ratings[i] = _to_float(record.get("Vote_Average"))
+            self.runtimes[i] = _to_float(record.get("Runtime"))
+            directors.append(str(record.get("Director") or "").lower())
+            casts.append(str(record.get("Cast") or "").lower())
+
+        self.directors = directors
+        self.casts = casts
+        self._director_mask = lru_cache(maxsize=256)(self._text_mask_factory(directors))
+        self._actor_mask = lru_cache(maxsize=256)(self._text_mask_factory(casts))
+
+    @staticmethod
+    def _text_mask_factory(values):
+        def text_mask(needle):
+            return np.fromiter((needle in value for value in values), dtype=bool, count=len(values))
+        return text_mask
+
+    def _value_mask(self, masks, key):
+        mask = masks.get(key)
+        return mask if mask is not None else np.zeros(self.size, dtype=bool)
+
+    def mask(self, filters):
+        """Boolean mask of documents passing every filter, or None without filters"""
+        filters = {key: value for key, value in (filters or {}).items() if value not in (None, "")}
+        if not filters:
+            return None
+
+        mask = np.ones(self.size, dtype=bool)
+
+        if "genre" in filters:
+            mask &= self._value_mask(self.genre_masks, str(filters["genre"]).strip().lower())
+        if "year" in filters:
+            mask &= self._value_mask(self.year_masks, str(filters["year"])[:4])
+        if "min_rating" in filters:
+            # NaN ratings compare False, like a missing rating in the UI filter
+            mask &= self.ratings >= float(filters["min_rating"])
+        if "runtime" in filters:
+            low, high = filters["runtime"]
+            mask &= (self.runtimes >= low) & (self.runtimes <= high)
+        if "director" in filters:
+            mask &= self._director_mask(str(filters["director"]).lower())
+        if "actor" in filters:
+            mask &= self._actor_mask(str(filters["actor"]).lower())
+
+        return mask
@@ -0,0 +1,90 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+PAGE_SIZE = 12
+# Ranked candidates kept per cursor: the deepest reachable result
+MAX_RESULTS = 200
+# Cursors unused for CURSOR_TTL seconds expire; at most MAX_CURSORS are kept
+CURSOR_TTL = 30 * 60
+MAX_CURSORS = 1000
+
+
+def slice_results(results, start, stop):
+    """Rows start:stop of a result list or a results DataFrame"""
+    if hasattr(results, "iloc"):
+        return results.iloc[start:stop].reset_index(drop=True)
+    return results[start:stop]
+
+
+class CursorStore:
+    """
+    Server-side candidate sets for cursor-based pagination. open() ranks a
+    query once and keeps its candidates under a cursor id; page() then slices
+    them, so later pages cost nothing and stay consistent with the first one
+    even if the index changes meanwhile. Least recently used cursors are
+    dropped beyond max_cursors, any cursor after ttl seconds without use.
+    """
+
+    def __init__(self, max_cursors=MAX_CURSORS, ttl=CURSOR_TTL):
+        self.max_cursors = max_cursors
+        self.ttl = ttl
+        self._cursors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, results, **extra):
+        """Keep a ranked candidate list and return its cursor id"""
+        cursor = uuid.uuid4().hex
+        with self._lock:
+            self._cursors[cursor] = (results, extra, time.time())
+            while len(self._cursors) > self.max_cursors:
+                self._cursors.popitem(last=False)
+        return cursor
+
+    def get(self, cursor):
+        """(results, extra) of a live cursor, or None if unknown or expired"""
+        with self._lock:
+            entry = self._cursors.get(cursor)
+            if entry is None:
+                return None
+            results, extra, used = entry
+            if time.time() - used > self.ttl:
+                del self._cursors[cursor]
+                return None
+            self._cursors[cursor] = (results, extra, time.time())
+            self._cursors.move_to_end(cursor)
+            return results, extra
+
+    def page(self, cursor, offset=0, limit=PAGE_SIZE):
+        """One page of a cursor: results, total, next_offset (None on the last page)"""
+        entry = self.get(cursor)
+        if entry is None:
+            raise KeyError(f"Unknown or expired cursor '{cursor}'")
+        results, extra = entry
+        stop = offset + limit
+        return {
+            **extra,
+            "cursor": cursor,
+            "results": slice_results(results, offset, stop),
+            "offset": offset,
+            "total": len(results),
+            "next_offset": stop if stop < len(results) else None,
+        }
+
+    def search_page(self, compute, offset=0, limit=PAGE_SIZE, cursor=None):
+        """
+        Page of an existing cursor, or of a new one opened with compute()
+        (the full ranked list, or (list, extra fields) for the page) when the
+        cursor is missing or has expired.
+        """
+        if cursor is not None and self.get(cursor) is not None:
+            return self.page(cursor, offset, limit)
+
+        computed = compute()
+        results, extra = computed if isinstance(computed, tuple) else (computed, {})
+        return self.page(self.open(results, **extra), offset, limit)
+
+
+# Shared by the engines of a process
+cursor_store = CursorStore()
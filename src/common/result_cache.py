@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+RESULT_CACHE_SIZE = 2048
+# Set to e.g. "data/result_cache.sqlite3" to share results between processes
+# (several Streamlit workers) and keep them across restarts
+RESULT_CACHE_PATH = None
+# Rows kept in the SQLite file, least recently used dropped first
+DISK_CACHE_SIZE = 100_000
+# The SQLite file is trimmed once every PRUNE_EVERY writes
+PRUNE_EVERY = 500
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive cache key for a query"""
+    return " ".join(str(query).split()).casefold()
+
+
+def folder_version(*paths):
+    """Fingerprint (relative name, size, mtime of every file) of index/store files or folders"""
+    digest = hashlib.sha1()
+    for path in paths:
+        if not os.path.exists(path):
+            digest.update(f"{path}:missing".encode())
+            continue
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                relative = os.path.relpath(os.path.join(root, name), path)
+                digest.update(f"{relative}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def cache_key(engine, version, query, top_n, filters=None):
+    """
+    Key of a result list: engine, index/store version, normalized query, top_n
+    and the active filters (empty ones dropped, so {} == {"genre": None}).
+    """
+    active = {name: value for name, value in (filters or {}).items() if value not in (None, "", [], ())}
+    return json.dumps(
+        [engine, version, normalize_query(query), top_n, active], sort_keys=True, default=str
+    )
+
+
+class ResultCache:
+    """
+    Search results keyed by cache_key(): an in-process LRU, optionally backed
+    by a SQLite file shared by every process using the same path. The index or
+    store version is part of the key, so a rebuilt index never serves old
+    results; rows of older versions are deleted from the file when a new
+    version is first written. Values are pickled, callers get their own copy.
+    """
+
+    def __init__(self, max_size=RESULT_CACHE_SIZE, path=None, disk_size=DISK_CACHE_SIZE):
+        self.max_size = max_size
+        self.path = path
+        self.disk_size = disk_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with self._connect() as db:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, engine TEXT, version TEXT, value BLOB, used REAL)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call: safe across threads and processes
+        db = sqlite3.connect(self.path, timeout=5)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, engine, version, query, top_n, filters=None):
+        key = cache_key(engine, version, query, top_n, filters)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+
+        if value is None and self.path:
+            with self._connect() as db:
+                row = db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = row[0]
+                    db.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+            if value is not None:
+                self._remember(key, value)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(value)
+
+    def put(self, engine, version, query, top_n, filters, results):
+        key = cache_key(engine, version, query, top_n, filters)
+        value = pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, value)
+        if not self.path:
+            return
+
+        with self._connect() as db:
+            if self._versions.get(engine) != version:
+                # First write of this version here: drop what older versions left
+                db.execute("DELETE FROM results WHERE engine = ? AND version != ?", (engine, version))
+                self._versions[engine] = version
+            db.execute(
+                "INSERT OR REPLACE INTO results (key, engine, version, value, used) VALUES (?, ?, ?, ?, ?)",
+                (key, engine, version, value, time.time()),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                db.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_size,),
+                )
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, engine, version, query, top_n, filters, compute):
+        """Cached results, or compute() stored under the key"""
+        results = self.get(engine, version, query, top_n, filters)
+        if results is None:
+            results = compute()
+            self.put(engine, version, query, top_n, filters, results)
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            with self._connect() as db:
+                db.execute("DELETE FROM results")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Shared by both engines (keys include the engine name)
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_PATH)
@@ -0,0 +1,268 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from ..common.pagination import MAX_RESULTS, PAGE_SIZE, cursor_store
+
+FUSION_METHODS = ["rrf", "linear"]
+# Reciprocal rank fusion: score = sum over retrievers of 1 / (RRF_K + rank)
+RRF_K = 60
+# Linear fusion: (1 - SEMANTIC_WEIGHT) * bm25 + SEMANTIC_WEIGHT * similarity,
+# each min-max normalized over its own candidates
+SEMANTIC_WEIGHT = 0.5
+# Candidates fetched from each retriever before fusion
+CANDIDATES = 50
+# Seconds each retriever may take, counted from the start of the query; a
+# retriever past its budget is left out of the fusion (its thread finishes in
+# the background)
+RETRIEVER_TIMEOUTS = {"bm25": 2.0, "semantic": 2.0}
+# Calls of a retriever running at once, timed-out ones included; past it the
+# retriever is skipped rather than queued. One semantic call: each encode
+# already uses every core. The thread pool has one thread per slot.
+MAX_IN_FLIGHT = {"bm25": 4, "semantic": 1}
+
+
+def bm25_hits(results):
+    """(Doc_Id, score, record) of a SmartSearchEngine results DataFrame"""
+    if results is None or len(results) == 0:
+        return []
+    return [(record["Doc_Id"], float(record["score"]), record) for record in results.to_dict("records")]
+
+
+def semantic_hits(results):
+    """(Doc_Id, score, record) of SemanticSearchEngine.search_documents() results"""
+    return [(record["Doc_Id"], float(record["Similarity"]), record) for record in results or []]
+
+
+def is_partial(info):
+    """True when a retriever was left out of the fusion (slow, failing, busy or warming up)"""
+    return bool(info["timed_out"] or info["errors"] or info["busy"] or info["warming"])
+
+
+def fusion_keys(ranked_lists):
+    """
+    Same ranked lists, keyed for fusion. Results of the legacy semantic engine
+    (embeddings.pkl) have no Doc_Id: they are matched by title to the hits
+    that have one, and otherwise keyed by their title alone.
+    """
+    by_title = {}
+    for hits in ranked_lists.values():
+        for doc_id, _, record in hits:
+            if doc_id is not None:
+                by_title.setdefault(record.get("Title"), doc_id)
+
+    def key(doc_id, record):
+        if doc_id is not None:
+            return doc_id
+        title = record.get("Title")
+        return by_title.get(title, ("title", title))
+
+    return {
+        name: [(key(doc_id, record), score, record) for doc_id, score, record in hits]
+        for name, hits in ranked_lists.items()
+    }
+
+
+def reciprocal_rank_fusion(ranked_lists, k=RRF_K):
+    """{name: [(Doc_Id, score, record), ...]} -> {Doc_Id: fused score}"""
+    fused = {}
+    for hits in ranked_lists.values():
+        for rank, (doc_id, _, _) in enumerate(hits, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return fused
+
+
+def linear_fusion(ranked_lists, weights):
+    """Weighted sum of min-max normalized scores; a missing document counts 0"""
+    fused = {}
+    for name, hits in ranked_lists.items():
+        if not hits:
+            continue
+        scores = [score for _, score, _ in hits]
+        low, high = min(scores), max(scores)
+        for doc_id, score, _ in hits:
+            normalized = (score - low) / (high - low) if high > low else 1.0
+            fused[doc_id] = fused.get(doc_id, 0.0) + weights[name] * normalized
+    return fused
+
+
+class HybridSearchEngine:
+    """
+    One query path over both engines: the BM25 and semantic retrievers run
+    concurrently in a thread pool, each within its timeout budget, and their
+    rankings are fused (reciprocal rank fusion or normalized linear combination).
+    Latency is that of the slower retriever, capped by its budget.
+
+    bm25_search(query, top_n, filters) returns a results DataFrame (run_search),
+    semantic_search(query, top_n, filters) a list of dicts (search_documents).
+    ready maps a retriever name to a callable telling whether it has loaded;
+    until then the retriever is skipped, so model loading never eats into
+    its budget.
+    """
+
+    def __init__(
+        self,
+        bm25_search,
+        semantic_search,
+        fusion="rrf",
+        candidates=CANDIDATES,
+        timeouts=None,
+        semantic_weight=SEMANTIC_WEIGHT,
+        max_in_flight=None,
+        ready=None,
+    ):
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion '{fusion}', expected one of {FUSION_METHODS}")
+        self.retrievers = {
+            "bm25": (bm25_search, bm25_hits),
+            "semantic": (semantic_search, semantic_hits),
+        }
+        self.fusion = fusion
+        self.candidates = candidates
+        self.timeouts = {**RETRIEVER_TIMEOUTS, **(timeouts or {})}
+        self.weights = {"bm25": 1.0 - semantic_weight, "semantic": semantic_weight}
+        self.ready = ready or {}
+        max_in_flight = {**MAX_IN_FLIGHT, **(max_in_flight or {})}
+        self.slots = {name: threading.BoundedSemaphore(max_in_flight[name]) for name in self.retrievers}
+        self.executor = ThreadPoolExecutor(
+            max_workers=sum(max_in_flight[name] for name in self.retrievers),
+            thread_name_prefix="hybrid",
+        )
+
+    def retrieve(self, query, filters=None):
+        """
+        Run every retriever concurrently.
+        Returns ({name: hits}, info) where info holds per-retriever timings and
+        the retrievers that timed out, failed, were still busy with earlier
+        calls or still warming up.
+        """
+        start = time.perf_counter()
+        info = {"timings": {}, "timed_out": [], "errors": {}, "busy": [], "warming": []}
+        futures = {}
+        for name, (search, to_hits) in self.retrievers.items():
+            ready = self.ready.get(name)
+            if ready is not None and not ready():
+                info["warming"].append(name)
+                continue
+            # The slot is released when the call ends, even after its timeout
+            if not self.slots[name].acquire(blocking=False):
+                info["busy"].append(name)
+                continue
+            future = self.executor.submit(self._run, search, to_hits, query, filters)
+            future.add_done_callback(lambda _, slot=self.slots[name]: slot.release())
+            futures[name] = future
+
+        ranked_lists = {}
+        for name, future in futures.items():
+            remaining = start + self.timeouts[name] - time.perf_counter()
+            try:
+                ranked_lists[name], info["timings"][name] = future.result(timeout=max(remaining, 0))
+            except TimeoutError:
+                info["timed_out"].append(name)
+            except Exception as error:
+                info["errors"][name] = repr(error)
+        info["timings"]["total"] = time.perf_counter() - start
+        return ranked_lists, info
+
+    def _run(self, search, to_hits, query, filters):
+        start = time.perf_counter()
+        hits = to_hits(search(query, top_n=self.candidates, filters=filters))
+        return hits, time.perf_counter() - start
+
+    def fuse(self, ranked_lists, top_n=10, fusion=None):
+        """Fused result list: one dict per movie, best first"""
+        fusion = fusion or self.fusion
+        ranked_lists = fusion_keys(ranked_lists)
+        if fusion == "rrf":
+            fused = reciprocal_rank_fusion(ranked_lists)
+        elif fusion == "linear":
+            fused = linear_fusion(ranked_lists, self.weights)
+        else:
+            raise ValueError(f"Unknown fusion '{fusion}', expected one of {FUSION_METHODS}")
+
+        # Per-retriever scores and the first record seen for each movie
+        records = {}
+        for name, hits in ranked_lists.items():
+            for doc_id, score, record in hits:
+                entry = records.setdefault(doc_id, {"record": record, "bm25": None, "semantic": None})
+                entry[name] = score
+
+        best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_n]
+        results = []
+        for key, score in best:
+            entry = records[key]
+            record = entry["record"]
+            results.append(
+                {
+                    "Doc_Id": None if isinstance(key, tuple) else key,
+                    "Title": record.get("Title", ""),
+                    "Overview": record.get("Overview", ""),
+                    "Genres": record.get("Genres", ""),
+                    "Director": record.get("Director", ""),
+                    "score": score,
+                    "bm25_score": entry["bm25"],
+                    "Similarity": entry["semantic"],
+                }
+            )
+        return results
+
+    def search_with_info(self, query, top_n=10, filters=None, fusion=None):
+        ranked_lists, info = self.retrieve(query, filters)
+        return self.fuse(ranked_lists, top_n, fusion), info
+
+    def search(self, query, top_n=10, filters=None, fusion=None):
+        return self.search_with_info(query, top_n, filters, fusion)[0]
+
+    def search_page(self, query, offset=0, limit=PAGE_SIZE, filters=None, cursor=None, postprocess=None):
+        """
+        Cursor-based pagination over the fused ranking (see pagination.py).
+        Every page carries the retrieval info of the first call. A cursor
+        holding a partial fusion is not reused: the next page ranks again,
+        with every retriever that is available by then.
+        """
+        def compute():
+            results, info = self.search_with_info(query, MAX_RESULTS, filters)
+            return (postprocess(results) if postprocess else results), {"info": info}
+
+        if cursor is not None:
+            entry = cursor_store.get(cursor)
+            if entry is not None and is_partial(entry[1]["info"]):
+                cursor = None
+        return cursor_store.search_page(compute, offset, limit, cursor)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+# Process-wide hybrid engine over the process-wide BM25 and semantic engines
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_hybrid_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from ..classification_search.smart_search_loader import run_search
+                from ..semantic_search.search_engine import engine, search_documents
+
+                def semantic_ready():
+                    # BM25 alone until the model has loaded in the background
+                    if not engine.is_ready:
+                        engine.warmup_async()
+                    return engine.is_ready
+
+                _engine = HybridSearchEngine(run_search, search_documents, ready={"semantic": semantic_ready})
+    return _engine
+
+
+if __name__ == "__main__":
+    # python -m src.hybrid_search.hybrid_engine "nolan space"
+    import sys
+
+    query = " ".join(sys.argv[1:]) or "batman"
+    results, info = get_hybrid_engine().search_with_info(query)
+    print(info)
+    for i, result in enumerate(results, 1):
+        print(f"{i}. {result['Title']}  fused={result['score']:.4f}  "
+              f"bm25={result['bm25_score']}  similarity={result['Similarity']}")
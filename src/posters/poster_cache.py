@@ -0,0 +1,212 @@
+import os
+import io
+import hashlib
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Poster thumbnails cached on local disk, keyed by Poster_Path, so result cards
+# are served from disk instead of one remote TMDB load per card.
+#   data/poster_cache/<sha1 of Poster_Path>.<jpg|png|...>
+# The least recently used files are evicted once the folder exceeds
+# MAX_CACHE_BYTES; last use is the file mtime, so the order survives restarts.
+
+# Set to a stub_origin.py URL (e.g. "http://127.0.0.1:8765") to test without TMDB
+POSTER_ORIGIN = "https://image.tmdb.org/t/p/w300"
+CACHE_DIR = "data/poster_cache"
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+# Eviction frees space down to this fraction of MAX_CACHE_BYTES
+EVICT_TO = 0.9
+# Thumbnails wider than this are resized (requires Pillow, stored as is otherwise)
+THUMBNAIL_WIDTH = 300
+FETCH_TIMEOUT = 5
+FETCH_WORKERS = 8
+
+IMAGE_TYPES = [(b"\xff\xd8\xff", ".jpg"), (b"\x89PNG", ".png"), (b"GIF8", ".gif"), (b"RIFF", ".webp")]
+
+
+def poster_key(poster_path):
+    return hashlib.sha1(str(poster_path).encode("utf-8")).hexdigest()
+
+
+def image_extension(data):
+    for magic, extension in IMAGE_TYPES:
+        if data.startswith(magic):
+            return extension
+    return None
+
+
+def make_thumbnail(data, width=THUMBNAIL_WIDTH):
+    """Downscale an image wider than width (JPEG output); unchanged without Pillow"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+
+    image = Image.open(io.BytesIO(data))
+    if image.width <= width:
+        return data
+    height = round(image.height * width / image.width)
+    output = io.BytesIO()
+    image.convert("RGB").resize((width, height), Image.LANCZOS).save(output, "JPEG", quality=85)
+    return output.getvalue()
+
+
+class PosterCache:
+    """
+    Size-bounded disk cache of poster thumbnails. get() returns the local file
+    of a poster, downloading it first if needed; fetch_many() does that for a
+    whole result page in parallel and prefetch() in the background. local_files()
+    never waits: it returns what is cached and prefetches the rest. Concurrent
+    requests for the same poster share one download.
+    """
+
+    def __init__(self, folder=CACHE_DIR, origin=POSTER_ORIGIN, max_bytes=MAX_CACHE_BYTES):
+        self.folder = folder
+        self.origin = origin.rstrip("/")
+        self.max_bytes = max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="posters")
+        self._lock = threading.Lock()
+        self._pending = {}
+        # key -> (file name, size), least recently used first
+        self._files = OrderedDict()
+        self.size = 0
+
+        os.makedirs(folder, exist_ok=True)
+        entries = []
+        for name in os.listdir(folder):
+            key, extension = os.path.splitext(name)
+            if extension and not name.endswith(".tmp"):
+                stat = os.stat(os.path.join(folder, name))
+                entries.append((stat.st_mtime, key, name, stat.st_size))
+        for _, key, name, size in sorted(entries):
+            self._files[key] = (name, size)
+            self.size += size
+
+    def cached_path(self, poster_path):
+        """Local file of an already cached poster (marked as used), or None"""
+        key = poster_key(poster_path)
+        with self._lock:
+            entry = self._files.get(key)
+            if entry is None:
+                return None
+            self._files.move_to_end(key)
+        path = os.path.join(self.folder, entry[0])
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Removed behind our back (e.g. another process evicted it)
+            with self._lock:
+                if self._files.pop(key, None) is not None:
+                    self.size -= entry[1]
+            return None
+        return path
+
+    def get(self, poster_path):
+        """Local file of a poster, downloaded on a miss; None if it cannot be fetched"""
+        if not poster_path or not isinstance(poster_path, str):
+            return None
+        path = self.cached_path(poster_path)
+        if path is not None:
+            return path
+        return self._download(poster_path).result()
+
+    def prefetch(self, poster_paths):
+        """Start downloading the posters not cached yet; returns their futures"""
+        futures = []
+        for poster_path in poster_paths:
+            if poster_path and isinstance(poster_path, str) and self.cached_path(poster_path) is None:
+                futures.append(self._download(poster_path))
+        return futures
+
+    def fetch_many(self, poster_paths, timeout=FETCH_TIMEOUT):
+        """{Poster_Path: local file or None} for a page of posters, downloaded in parallel"""
+        poster_paths = [p for p in dict.fromkeys(poster_paths) if p and isinstance(p, str)]
+        wait(self.prefetch(poster_paths), timeout=timeout)
+        return {poster_path: self.cached_path(poster_path) for poster_path in poster_paths}
+
+    def local_files(self, poster_paths):
+        """{Poster_Path: local file} of the cached posters; the missing ones start downloading"""
+        poster_paths = [p for p in dict.fromkeys(poster_paths) if p and isinstance(p, str)]
+        files = {}
+        for poster_path in poster_paths:
+            path = self.cached_path(poster_path)
+            if path is None:
+                self._download(poster_path)
+            else:
+                files[poster_path] = path
+        return files
+
+    def _download(self, poster_path):
+        key = poster_key(poster_path)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self.executor.submit(self._fetch, poster_path, key)
+                self._pending[key] = future
+        return future
+
+    def _fetch(self, poster_path, key):
+        try:
+            url = self.origin + "/" + poster_path.lstrip("/")
+            with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+                data = response.read()
+            data = make_thumbnail(data)
+            extension = image_extension(data)
+            if extension is None:
+                return None
+
+            name = key + extension
+            path = os.path.join(self.folder, name)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+
+            with self._lock:
+                previous = self._files.pop(key, None)
+                if previous is not None:
+                    self.size -= previous[1]
+                self._files[key] = (name, len(data))
+                self.size += len(data)
+            self.evict()
+            return path
+        except (OSError, ValueError) as error:
+            print(f"Poster indisponible {poster_path} : {error}")
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def evict(self):
+        """Remove least recently used posters until the cache fits its size bound"""
+        if self.size <= self.max_bytes:
+            return
+        removed = []
+        with self._lock:
+            while self._files and self.size > self.max_bytes * EVICT_TO:
+                _, (name, size) = self._files.popitem(last=False)
+                self.size -= size
+                removed.append(name)
+        for name in removed:
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        return {"files": len(self._files), "bytes": self.size, "max_bytes": self.max_bytes}
+
+
+# Process-wide cache, built (and its folder scanned) on first use
+_poster_cache = None
+_poster_cache_lock = threading.Lock()
+
+
+def get_poster_cache():
+    global _poster_cache
+    if _poster_cache is None:
+        with _poster_cache_lock:
+            if _poster_cache is None:
+                _poster_cache = PosterCache()
+    return _poster_cache
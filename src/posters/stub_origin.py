@@ -0,0 +1,85 @@
+import sys
+import time
+import zlib
+import struct
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the TMDB image origin: any GET /<Poster_Path> returns a
+# solid-color PNG poster (color derived from the path), after an optional
+# delay that mimics a remote fetch. Point poster_cache.POSTER_ORIGIN (or a
+# PosterCache origin) at it to test the cache without network access:
+#   python -m src.posters.stub_origin 8765 0.2
+
+POSTER_WIDTH = 300
+POSTER_HEIGHT = 450
+
+
+def solid_png(width, height, rgb):
+    """Minimal PNG of a single color, no imaging library needed"""
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    row = b"\x00" + bytes(rgb) * width
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(row * height, 9))
+        + chunk(b"IEND", b"")
+    )
+
+
+class StubOrigin:
+    """Threaded HTTP server in a daemon thread; counts the requests it serves"""
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0):
+        self.delay = delay
+        self.requests = 0
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                origin.requests += 1
+                if origin.delay:
+                    time.sleep(origin.delay)
+                if not self.path.lower().endswith((".jpg", ".jpeg", ".png")):
+                    self.send_error(404)
+                    return
+                rgb = hashlib.sha1(self.path.encode("utf-8")).digest()[:3]
+                data = solid_png(POSTER_WIDTH, POSTER_HEIGHT, rgb)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-origin", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+    origin = StubOrigin(port=port, delay=delay)
+    print(f"Origine de posters locale : {origin.url} (délai {delay}s)")
+    origin.server.serve_forever()
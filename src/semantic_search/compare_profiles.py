@@ -0,0 +1,85 @@
+import sys
+import time
+import argparse
+import numpy as np
+from embedding_cache import QueryEmbeddingCache
+from encoders import DEFAULT_PROFILE, ENCODER_PROFILES, profile_exists
+from evaluation import K, ground_truth, ndcg, precision_at_k
+from search_engine import SemanticSearchEngine
+
+# Quality / latency trade-off of the encoder profiles (encoders.py), on the
+# ground truth queries:
+#   P@K, NDCG@K   against data/ground_truth.json
+#   Recall@K      overlap of the top K with the reference profile's top K
+#   p50/p95/p99   query latency (encode + search), query cache disabled
+# Every profile must have been built: create_embeddings.py --profile <name>
+
+parser = argparse.ArgumentParser(description="Compare encoder profiles (quality and latency)")
+parser.add_argument("profiles", nargs="*", help="Profiles to compare (default: every built profile)")
+parser.add_argument("--reference", default=DEFAULT_PROFILE, help="Profile whose results count as exact")
+parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the queries")
+
+
+def run_profile(profile, queries, repeat):
+    """Top K Doc_Ids and titles per query, plus load time and per-query latencies"""
+    # max_size=0: every query goes through the model, as a cold query would
+    engine = SemanticSearchEngine(profile, query_cache=QueryEmbeddingCache(max_size=0))
+    start = time.perf_counter()
+    engine.warmup()
+    engine.search_documents(queries[0], top_n=K)  # first call pays one-off setup costs
+    load_time = time.perf_counter() - start
+
+    latencies = []
+    results = []
+    for _ in range(repeat):
+        results = []
+        for query in queries:
+            start = time.perf_counter()
+            results.append(engine.search_documents(query, top_n=K))
+            latencies.append(time.perf_counter() - start)
+    return results, load_time, np.array(latencies) * 1000
+
+
+def compare(profiles, reference, repeat):
+    queries = list(ground_truth)
+    runs = {}
+    for profile in profiles:
+        print(f"\n=== {profile} ===")
+        runs[profile] = run_profile(profile, queries, repeat)
+
+    reference_ids = None
+    if reference in runs:
+        reference_ids = [[r["Doc_Id"] for r in results] for results in runs[reference][0]]
+
+    print(f"\n{'Profile':<14} {f'P@{K}':>6} {f'NDCG@{K}':>8} {f'Recall@{K}':>10} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'load s':>7}")
+    for profile, (all_results, load_time, latencies) in runs.items():
+        precision = np.mean([
+            precision_at_k([r["Title"] for r in results], ground_truth[query], K)
+            for query, results in zip(queries, all_results)
+        ])
+        quality = np.mean([
+            ndcg([r["Title"] for r in results], ground_truth[query], K)
+            for query, results in zip(queries, all_results)
+        ])
+        if reference_ids is None:
+            recall = "-"
+        else:
+            overlaps = [
+                len({r["Doc_Id"] for r in results} & set(expected)) / len(expected)
+                for results, expected in zip(all_results, reference_ids)
+                if expected
+            ]
+            recall = f"{np.mean(overlaps):.3f}" if overlaps else "-"
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{profile:<14} {precision:>6.3f} {quality:>8.3f} {recall:>10} "
+              f"{p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {load_time:>7.1f}")
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    profiles = args.profiles or [name for name in ENCODER_PROFILES if profile_exists(name)]
+    missing = [name for name in profiles if not profile_exists(name)]
+    if missing:
+        sys.exit(f"Profiles not built: {', '.join(missing)} (run create_embeddings.py --profile <name>)")
+    compare(profiles, args.reference, args.repeat)
@@ -1,45 +1,233 @@
 import os
+import sys
 import json
+import math
+import time
 import numpy as np
-import pickle
-from sentence_transformers import SentenceTransformer
+import argparse
+
+# Shared modules live in src/common
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.document_store import CHUNK_SIZE, DOCUMENTS_PATH, DocumentStore
+from vector_index import build_vector_index, save_vector_index
+from encoders import DEFAULT_PROFILE, ENCODER_PROFILES, encoder_id, get_profile, load_encoder
+from vector_store import (
+    STORE_DTYPES,
+    VectorStoreWriter,
+    compact_vector_store,
+    content_hash,
+    document_text,
+    load_content_hashes,
+    load_vector_store,
+)
 
 DOCS_PATH = "data/Docs/"
-MODEL_NAME = "all-mpnet-base-v2"
+# Pieces handed to each encode worker per document chunk (load balancing)
+POOL_CHUNKS_PER_WORKER = 4
+
+parser = argparse.ArgumentParser(description="Création des embeddings et de l'index vectoriel")
+parser.add_argument("--profile", choices=list(ENCODER_PROFILES), default=DEFAULT_PROFILE,
+                    help="Modèle d'embeddings ; chaque profil a son propre vector store (voir encoders.py)")
+parser.add_argument("--dtype", choices=STORE_DTYPES, default="float32",
+                    help="Précision des vecteurs stockés (float16/int8 : 2x/4x plus compact)")
+parser.add_argument("--index", choices=["flat", "ivf", "hnsw"], default="flat")
+parser.add_argument("--n-lists", type=int, default=None, help="IVF : nombre de listes")
+parser.add_argument("--n-probe", type=int, default=8, help="IVF : listes visitées par requête")
+parser.add_argument("--hnsw-m", type=int, default=16, help="HNSW : degré du graphe")
+parser.add_argument("--ef-construction", type=int, default=200)
+parser.add_argument("--ef-search", type=int, default=64, help="HNSW : largeur de recherche")
+parser.add_argument("--compact", action="store_true",
+                    help="Fusionner les segments (films ajoutés/supprimés) sans ré-encoder, puis reconstruire l'index")
+parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                    help="Documents lus, encodés et écrits (checkpoint) à la fois")
+parser.add_argument("--batch-size", type=int, default=32, help="Taille des lots passés au modèle")
+parser.add_argument("--workers", type=int, default=1,
+                    help="Processus d'encodage CPU (0 : un par cœur, 1 : séquentiel)")
+parser.add_argument("--restart", action="store_true",
+                    help="Ignorer le checkpoint d'un run interrompu et tout recommencer")
+parser.add_argument("--force", action="store_true",
+                    help="Ré-encoder aussi les documents dont le contenu n'a pas changé")
+
+
+def iter_document_chunks(chunk_size):
+    """Documents in a stable (Doc_Id) order, chunk by chunk, never all in memory"""
+    if os.path.exists(DOCUMENTS_PATH):
+        # Consolidated store: streamed line by line
+        yield from DocumentStore(DOCUMENTS_PATH).iter_chunks(chunk_size)
+        return
+
+    # row_N.json holds row N - 1 of cleaned_movies.csv
+    files = sorted(
+        (int(file[len("row_"):-len(".json")]) - 1, file)
+        for file in os.listdir(DOCS_PATH)
+        if file.startswith("row_") and file.endswith(".json")
+    )
+    for start in range(0, len(files), chunk_size):
+        chunk = []
+        for doc_id, file in files[start:start + chunk_size]:
+            with open(os.path.join(DOCS_PATH, file), "r", encoding="utf-8") as f:
+                doc = json.load(f)
+                doc["Doc_Id"] = doc_id
+                chunk.append(doc)
+        yield chunk
+
+
+def previous_vectors(store_path, model_name, dtype, force=False):
+    """
+    (vectors, Doc_Id -> row, Doc_Id -> hash) of the current store, if built
+    with this model and in this dtype or float32: vectors read back from a
+    lossy store are never passed off as more precise ones.
+    """
+    if force or not os.path.exists(store_path):
+        return None, {}, {}
+    vectors, documents, meta = load_vector_store(store_path)
+    if meta.get("model") != model_name:
+        return None, {}, {}
+    if meta.get("dtype") not in (dtype, "float32"):
+        print(f"Store en {meta.get('dtype')} : tous les documents sont ré-encodés en {dtype}")
+        return None, {}, {}
+    rows = {doc_id: row for row, doc_id in enumerate(documents.columns["Doc_Id"]) if doc_id is not None}
+    return vectors, rows, load_content_hashes(store_path)
+
+
+class CorpusEncoder:
+    """
+    Normalized embeddings for corpus builds. The model is only loaded if
+    something needs encoding; with workers > 1 a pool of CPU processes
+    (sentence-transformers multi-process pool) shares the work.
+    Texts are sorted by length so each batch holds texts of similar size
+    (less padding), and every piece sent to a worker is a whole number of
+    batches: the batches, hence the vectors, are the same as sequentially.
+    """
+
+    def __init__(self, profile=DEFAULT_PROFILE, batch_size=32, workers=1):
+        self.profile = profile
+        self.batch_size = batch_size
+        self.workers = workers if workers > 0 else os.cpu_count() or 1
+        self.model = None
+        self.pool = None
+        self.encoded = 0
+        self.seconds = 0.0
+
+    def _load(self):
+        print(f"Chargement du modèle d'embeddings ({self.profile})...")
+        self.model = load_encoder(self.profile)
+        if self.workers > 1:
+            print(f"Démarrage de {self.workers} processus d'encodage...")
+            self.pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.workers)
+
+    def encode(self, texts):
+        if self.model is None:
+            self._load()
+        start = time.perf_counter()
+
+        # Longest first, as SentenceTransformer.encode orders each call
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        by_length = [texts[i] for i in order]
+        if self.pool is None:
+            vectors = self.model.encode(by_length, batch_size=self.batch_size, normalize_embeddings=True)
+        else:
+            batches = math.ceil(len(texts) / self.batch_size)
+            per_piece = max(1, math.ceil(batches / (self.workers * POOL_CHUNKS_PER_WORKER)))
+            vectors = self.model.encode_multi_process(
+                by_length, self.pool,
+                batch_size=self.batch_size,
+                chunk_size=per_piece * self.batch_size,
+                normalize_embeddings=True,
+            )
+
+        embeddings = np.empty_like(vectors)
+        embeddings[order] = vectors
+        self.encoded += len(texts)
+        self.seconds += time.perf_counter() - start
+        return embeddings
+
+    @property
+    def docs_per_second(self):
+        return self.encoded / self.seconds if self.seconds else 0.0
+
+    def close(self):
+        if self.pool is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+
+def main(args):
+    profile = get_profile(args.profile)
+    store_path, index_path = profile["store"], profile["index"]
+    model_name = encoder_id(args.profile)
+
+    index_params = {
+        "flat": {},
+        "ivf": {"n_lists": args.n_lists, "n_probe": args.n_probe},
+        "hnsw": {"M": args.hnsw_m, "ef_construction": args.ef_construction, "ef_search": args.ef_search},
+    }[args.index]
+
+    if args.compact:
+        embeddings, documents = compact_vector_store(store_path)
+        print(f"Vector store compacté : {len(documents)} documents")
+        save_vector_index(build_vector_index(embeddings, args.index, **index_params), index_path)
+        print(f"Index vectoriel sauvegardé : {index_path}")
+        return
+
+    old_vectors, old_rows, old_hashes = previous_vectors(store_path, model_name, args.dtype, args.force)
+    writer = VectorStoreWriter(store_path, dtype=args.dtype, model_name=model_name, resume=not args.restart)
+    to_skip = writer.documents_done
+    if to_skip:
+        print(f"Reprise après {to_skip} documents déjà encodés.")
 
-print("Chargement du modèle d'embeddings...")
-model = SentenceTransformer(MODEL_NAME)
+    print("Création des embeddings...")
+    encoder = CorpusEncoder(args.profile, batch_size=args.batch_size, workers=args.workers)
+    start = time.perf_counter()
+    reused = 0
+    try:
+        for chunk in iter_document_chunks(args.chunk_size):
+            if to_skip >= len(chunk):
+                to_skip -= len(chunk)
+                continue
+            chunk, to_skip = chunk[to_skip:], 0
 
-documents = []
-texts = []
+            texts = [document_text(doc) for doc in chunk]
+            hashes = [content_hash(text) for text in texts]
 
+            # Unchanged documents keep their stored vector
+            unchanged = [
+                i for i, (doc, digest) in enumerate(zip(chunk, hashes))
+                if doc.get("Doc_Id") in old_rows and old_hashes.get(doc.get("Doc_Id")) == digest
+            ]
+            changed = sorted(set(range(len(chunk))) - set(unchanged))
 
-for file in os.listdir(DOCS_PATH):
-    if file.endswith(".json"):
-        with open(os.path.join(DOCS_PATH, file), "r", encoding="utf-8") as f:
-            doc = json.load(f)
-            documents.append(doc)
+            vectors = {}
+            if unchanged:
+                rows = [old_rows[chunk[i]["Doc_Id"]] for i in unchanged]
+                vectors.update(zip(unchanged, np.asarray(old_vectors[rows], dtype=np.float32)))
+            if changed:
+                vectors.update(zip(changed, encoder.encode([texts[i] for i in changed])))
 
-            text = f"""
-            Title: {doc.get('Title','')}
-            Overview: {doc.get('Overview','')}
-            Keywords: {doc.get('Keywords','')}
-            Genres: {doc.get('Genres','')}
-            Director: {doc.get('Director','')}
-            Cast: {doc.get('Cast','')}
-            Year: {str(doc.get('Release_Date',''))[:4]} 
-            Tagline: {doc.get('Tagline','')}
-            """
+            writer.append(np.stack([vectors[i] for i in range(len(chunk))]), chunk, hashes)
+            reused += len(unchanged)
+            elapsed = time.perf_counter() - start
+            print(f"  {writer.documents_done} documents ({encoder.encoded} encodés, {reused} inchangés) - "
+                  f"{elapsed:.0f}s, {encoder.docs_per_second:.1f} docs/s")
+    finally:
+        encoder.close()
 
-            texts.append(text)
+    if encoder.encoded:
+        print(f"Encodage : {encoder.encoded} documents en {encoder.seconds:.1f}s "
+              f"({encoder.docs_per_second:.1f} docs/s, {encoder.workers} processus)")
 
-print(f"{len(texts)} documents chargés.")
+    count = writer.close()
+    print(f"Embeddings sauvegardés : {store_path} ({args.dtype}, {count} documents)")
 
-print("Création des embeddings...")
-embeddings = model.encode(texts, show_progress_bar=True, normalize_embeddings=True)
+    print(f"Construction de l'index vectoriel ({args.index})...")
+    embeddings, _, _ = load_vector_store(store_path)
+    vector_index = build_vector_index(embeddings, args.index, **index_params)
+    save_vector_index(vector_index, index_path)
 
-with open("data/embeddings.pkl", "wb") as f:
-    pickle.dump({"embeddings": embeddings, "documents": documents, "texts": texts}, f)
+    print(f"Index vectoriel sauvegardé : {index_path}")
 
 
-print("Embeddings sauvegardés : data/embeddings.pkl")
+if __name__ == "__main__":
+    # The encode pool spawns processes that re-import this module: only the
+    # main process may parse arguments and run the build
+    main(parser.parse_args())
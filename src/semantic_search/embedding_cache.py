@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+try:
+    from ..common.result_cache import normalize_query
+except ImportError:  # run as a script from src/semantic_search
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.result_cache import normalize_query
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings, keyed by (model name, normalized query).
+    Entries older than ttl seconds are treated as misses. With a path, the
+    cache can be saved to and reloaded from a .npz file between restarts.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def get(self, model_name, query):
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, model_name, query, embedding, created=None):
+        key = (model_name, normalize_query(query))
+        with self._lock:
+            self._entries[key] = (np.asarray(embedding), created or time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self, path=None):
+        """
+        Write the cache to a .npz file: one group of arrays per model (their
+        dimensions differ), each row with its rank in the LRU order.
+        """
+        path = path or self.path
+        with self._lock:
+            entries = list(self._entries.items())
+        if not path or not entries:
+            return
+
+        groups = {}
+        for position, ((model, query), (vector, created)) in enumerate(entries):
+            groups.setdefault(model, []).append((position, query, vector, created))
+
+        arrays = {"models": np.array(list(groups))}
+        for i, rows in enumerate(groups.values()):
+            arrays[f"positions_{i}"] = np.array([position for position, _, _, _ in rows])
+            arrays[f"queries_{i}"] = np.array([query for _, query, _, _ in rows])
+            arrays[f"embeddings_{i}"] = np.stack([vector for _, _, vector, _ in rows])
+            arrays[f"created_{i}"] = np.array([created for _, _, _, created in rows])
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, **arrays)
+
+    def load(self, path=None):
+        """Reload a saved cache, least recently used first"""
+        path = path or self.path
+        with np.load(path) as data:
+            rows = []
+            for i, model in enumerate(data["models"]):
+                rows.extend(
+                    (position, str(model), str(query), vector, float(created))
+                    for position, query, vector, created in zip(
+                        data[f"positions_{i}"],
+                        data[f"queries_{i}"],
+                        data[f"embeddings_{i}"],
+                        data[f"created_{i}"],
+                    )
+                )
+        for _, model, query, vector, created in sorted(rows, key=lambda row: row[0]):
+            self.put(model, query, vector, created)
@@ -0,0 +1,70 @@
+import os
+
+# Encoder profiles: the model that embeds documents and queries, and where its
+# embeddings live. Each profile has its own vector store and vector index
+# (vectors of different models are not comparable); mpnet keeps the historical
+# paths. Build a profile with create_embeddings.py --profile <name> and compare
+# them with compare_profiles.py.
+#   quantize="int8"  dynamic int8 quantization of the Linear layers (CPU only):
+#                    smaller and faster on CPU, slightly different vectors
+ENCODER_PROFILES = {
+    "mpnet": {
+        "model": "all-mpnet-base-v2",
+        "store": "data/vector_store",
+        "index": "data/vector_index",
+    },
+    "minilm": {
+        "model": "all-MiniLM-L6-v2",
+        "store": "data/profiles/minilm/vector_store",
+        "index": "data/profiles/minilm/vector_index",
+    },
+    "minilm-int8": {
+        "model": "all-MiniLM-L6-v2",
+        "quantize": "int8",
+        "store": "data/profiles/minilm-int8/vector_store",
+        "index": "data/profiles/minilm-int8/vector_index",
+    },
+    "mpnet-int8": {
+        "model": "all-mpnet-base-v2",
+        "quantize": "int8",
+        "store": "data/profiles/mpnet-int8/vector_store",
+        "index": "data/profiles/mpnet-int8/vector_index",
+    },
+}
+DEFAULT_PROFILE = "mpnet"
+
+
+def get_profile(name=DEFAULT_PROFILE):
+    if name not in ENCODER_PROFILES:
+        raise ValueError(f"Unknown encoder profile '{name}', expected one of {list(ENCODER_PROFILES)}")
+    return ENCODER_PROFILES[name]
+
+
+def encoder_id(name=DEFAULT_PROFILE):
+    """
+    Identifier of the vectors a profile produces, recorded in the vector store
+    metadata and used as query cache key: "all-mpnet-base-v2", "all-MiniLM-L6-v2+int8"...
+    """
+    profile = get_profile(name)
+    if profile.get("quantize"):
+        return f"{profile['model']}+{profile['quantize']}"
+    return profile["model"]
+
+
+def profile_exists(name):
+    profile = get_profile(name)
+    return os.path.exists(profile["store"]) and os.path.exists(profile["index"])
+
+
+def load_encoder(name=DEFAULT_PROFILE):
+    """SentenceTransformer of a profile, quantized if the profile asks for it"""
+    profile = get_profile(name)
+    # Imported here: pulling in torch is part of the model stage
+    from sentence_transformers import SentenceTransformer
+
+    if profile.get("quantize") == "int8":
+        import torch
+
+        model = SentenceTransformer(profile["model"], device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return SentenceTransformer(profile["model"])
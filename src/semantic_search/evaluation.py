@@ -1,6 +1,6 @@
 import json
 import math
-from search_engine import search_documents
+from search_engine import search_many
 
 # Load ground truth
 with open("data/ground_truth.json", "r") as f:
@@ -55,8 +55,12 @@ def evaluate():
     total_mrr = 0
     n = len(ground_truth)
 
-    for query, relevant in ground_truth.items():
-        results = search_documents(query)
+    # One batched pass over every query
+    queries = list(ground_truth)
+    all_results = search_many(queries, top_n=K)
+
+    for query, results in zip(queries, all_results):
+        relevant = ground_truth[query]
         predicted = [r["Title"] for r in results]
 
         p = precision_at_k(predicted, relevant, K)
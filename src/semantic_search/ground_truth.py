@@ -1,27 +1,41 @@
 import os
+import sys
 import json
 import re
 
+# Shared modules live in src/common
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.document_store import DOCUMENTS_PATH, DocumentStore
+
 DOCS_PATH = "data/Docs/"
 
+
+def iter_documents():
+    """Movies from the document store, or from the legacy row_N.json folder"""
+    if os.path.exists(DOCUMENTS_PATH):
+        yield from DocumentStore(DOCUMENTS_PATH)
+        return
+    for file in os.listdir(DOCS_PATH):
+        if file.endswith(".json"):
+            with open(os.path.join(DOCS_PATH, file), "r", encoding="utf-8") as f:
+                yield json.load(f)
+
+
 # Load all movies
 movies = []
-for file in os.listdir(DOCS_PATH):
-    if file.endswith(".json"):
-        with open(os.path.join(DOCS_PATH, file), "r", encoding="utf-8") as f:
-            doc = json.load(f)
-            title = doc.get("Title", "").strip()
-            text = (
-                f"{doc.get('Title','')} "
-                f"{doc.get('Overview','')} "
-                f"{doc.get('Genres','')} "
-                f"{doc.get('Keywords','')}"
-                f"{doc.get('Director','')} "
-                f"{doc.get('Cast','')} "
-                f"{str(doc.get('Release_Date',''))[:4]} "
-                f"{doc.get('Tagline','')}"
-            ).lower()
-            movies.append({"title": title, "text": text})
+for doc in iter_documents():
+    title = doc.get("Title", "").strip()
+    text = (
+        f"{doc.get('Title','')} "
+        f"{doc.get('Overview','')} "
+        f"{doc.get('Genres','')} "
+        f"{doc.get('Keywords','')}"
+        f"{doc.get('Director','')} "
+        f"{doc.get('Cast','')} "
+        f"{str(doc.get('Release_Date',''))[:4]} "
+        f"{doc.get('Tagline','')}"
+    ).lower()
+    movies.append({"title": title, "text": text})
 
 print(f"Loaded {len(movies)} movies.")
 
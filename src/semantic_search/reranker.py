@@ -0,0 +1,158 @@
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+try:
+    from .embedding_cache import normalize_query
+except ImportError:  # run as a script from src/semantic_search
+    from embedding_cache import normalize_query
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# Candidates rescored at most, best first
+RERANK_TOP_N = 30
+# Seconds the cross-encoder may spend per query; the number of candidates
+# rescored is capped by the measured cost per pair
+RERANK_BUDGET = 0.3
+RERANK_BATCH_SIZE = 16
+PAIR_CACHE_SIZE = 50_000
+# Weight of the latest batch in the running cost per pair
+COST_SMOOTHING = 0.2
+
+
+def pair_text(record):
+    """Document side of a (query, document) pair"""
+    parts = [record.get("Title"), record.get("Genres"), record.get("Director"), record.get("Overview")]
+    return ". ".join(str(part) for part in parts if part and part == part)
+
+
+def pair_key(record):
+    """Cache key of the document side: its Doc_Id, or its text for results without one"""
+    doc_id = record.get("Doc_Id")
+    if doc_id is None or doc_id != doc_id:
+        return ("text", pair_text(record))
+    return doc_id
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage re-ranker: a small cross-encoder rescores the top candidates of
+    either engine (search_documents() dicts or a SmartSearchEngine.search()
+    DataFrame). Pairs are scored in batches, best candidates first, and scoring
+    stops when the next batch would not fit in the latency budget; only the
+    scored prefix is re-ordered, the other candidates keep their order after
+    it. Scores are cached per (query, Doc_Id) (see pair_key), so paging or
+    repeating a query costs nothing.
+    """
+
+    def __init__(
+        self,
+        model_name=RERANK_MODEL,
+        top_n=RERANK_TOP_N,
+        budget=RERANK_BUDGET,
+        batch_size=RERANK_BATCH_SIZE,
+        cache_size=PAIR_CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.top_n = top_n
+        self.budget = budget
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.model = None
+        # Running estimate of the seconds needed to score one pair
+        self.seconds_per_pair = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def warmup(self):
+        with self._lock:
+            if self.model is None:
+                print("Chargement du cross-encoder...")
+                from sentence_transformers import CrossEncoder
+
+                self.model = CrossEncoder(self.model_name, device="cpu")
+        return self
+
+    def _cached(self, query_key, doc_key):
+        with self._lock:
+            key = (query_key, doc_key)
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, query_key, doc_keys, scores):
+        with self._lock:
+            for doc_key, score in zip(doc_keys, scores):
+                self._cache[(query_key, doc_key)] = float(score)
+                self._cache.move_to_end((query_key, doc_key))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def affordable(self, budget):
+        """Pairs that fit in the budget at the measured cost (all of top_n before any measure)"""
+        if not self.seconds_per_pair:
+            return self.top_n
+        return max(1, min(self.top_n, int(budget / self.seconds_per_pair)))
+
+    def score(self, query, records):
+        """
+        Cross-encoder score of the leading records (records are in rank order):
+        the longest prefix that could be scored within the budget, then None.
+        """
+        self.warmup()
+        query_key = (self.model_name, normalize_query(query))
+        candidates = records[:self.top_n]
+        scores = [self._cached(query_key, pair_key(record)) for record in candidates]
+        # Cached pairs are free: only the pairs to compute count against the budget
+        missing = [i for i, score in enumerate(scores) if score is None][:self.affordable(self.budget)]
+
+        start = time.perf_counter()
+        for first in range(0, len(missing), self.batch_size):
+            batch = missing[first:first + self.batch_size]
+            elapsed = time.perf_counter() - start
+            if first and elapsed + len(batch) * self.seconds_per_pair > self.budget:
+                break
+
+            batch_start = time.perf_counter()
+            pairs = [(query, pair_text(candidates[i])) for i in batch]
+            batch_scores = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            cost = (time.perf_counter() - batch_start) / len(batch)
+            self.seconds_per_pair = cost if self.seconds_per_pair is None else (
+                (1 - COST_SMOOTHING) * self.seconds_per_pair + COST_SMOOTHING * cost
+            )
+
+            for i, value in zip(batch, np.asarray(batch_scores, dtype=np.float32)):
+                scores[i] = float(value)
+            self._store(query_key, [pair_key(candidates[i]) for i in batch], [scores[i] for i in batch])
+
+        scored = scores.index(None) if None in scores else len(scores)
+        return scores[:scored] + [None] * (len(records) - scored)
+
+    def rerank(self, query, results):
+        """
+        Results re-ordered by cross-encoder score, with a rerank_score field.
+        Accepts a list of dicts or a results DataFrame, and returns the same type.
+        """
+        frame = None
+        if hasattr(results, "to_dict"):
+            frame, results = results, results.to_dict("records")
+        if not results:
+            return frame if frame is not None else results
+
+        scores = self.score(query, results)
+        scored = scores.index(None) if None in scores else len(scores)
+        order = sorted(range(scored), key=lambda i: scores[i], reverse=True) + list(range(scored, len(results)))
+        reranked = [{**results[i], "rerank_score": scores[i]} for i in order]
+
+        if frame is not None:
+            return type(frame)(reranked, columns=list(frame.columns) + ["rerank_score"])
+        return reranked
+
+
+# Process-wide re-ranker; the model is loaded on first use
+reranker = CrossEncoderReranker()
+
+
+def rerank(query, results):
+    return reranker.rerank(query, results)
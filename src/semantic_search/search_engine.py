@@ -1,64 +1,471 @@
+import os
+import sys
+import atexit
+import time
 import pickle
+import threading
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+
+try:
+    from ..common.filter_index import FilterIndex
+    from ..common.pagination import MAX_RESULTS, PAGE_SIZE, cursor_store
+    from ..common.result_cache import folder_version, result_cache
+    from .embedding_cache import QueryEmbeddingCache
+    from .encoders import DEFAULT_PROFILE, encoder_id, get_profile, load_encoder
+    from .vector_index import load_vector_index, top_k_rows
+    from .vector_store import (
+        append_segment,
+        document_text,
+        load_segments,
+        load_vector_store,
+        read_tombstones,
+        write_tombstones,
+    )
+except ImportError:  # run as a script from src/semantic_search
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from common.filter_index import FilterIndex
+    from common.pagination import MAX_RESULTS, PAGE_SIZE, cursor_store
+    from common.result_cache import folder_version, result_cache
+    from embedding_cache import QueryEmbeddingCache
+    from encoders import DEFAULT_PROFILE, encoder_id, get_profile, load_encoder
+    from vector_index import load_vector_index, top_k_rows
+    from vector_store import (
+        append_segment,
+        document_text,
+        load_segments,
+        load_vector_store,
+        read_tombstones,
+        write_tombstones,
+    )
 
 DOCS_PATH = "data/Docs/"
-MODEL_NAME = "all-mpnet-base-v2"
+# Encoder profile of the process-wide engine (model, vector store and index),
+# see encoders.ENCODER_PROFILES; e.g. "minilm-int8" for faster CPU queries
+ENCODER_PROFILE = DEFAULT_PROFILE
+LEGACY_EMBEDDINGS_PATH = "data/embeddings.pkl"
+QUERY_CACHE_SIZE = 4096
+# Set to e.g. "data/query_cache.npz" to keep query embeddings across restarts
+QUERY_CACHE_PATH = None
 SIMILARITY_THRESHOLD = 0.3
+# Neighbours fetched when filters are set (they are applied after retrieval)
+FILTERED_CANDIDATES = 1000
+
+
+class SemanticState:
+    """
+    Everything a search reads besides the base vectors and index: the document
+    table, embeddings of the added rows (after the n_base indexed ones), the
+    deleted rows and the filter masks built over them. Updates build a new
+    one and publish it with a single assignment, so a search that takes
+    engine.state once never mixes rows from before and after an update.
+    """
+
+    def __init__(self, documents, n_base, added_embeddings=None, tombstones=frozenset()):
+        self.documents = documents
+        self.n_base = n_base
+        self.added_embeddings = added_embeddings
+        self.tombstones = frozenset(tombstones)
+        # Built on the first filtered search
+        self.filter_index = None
+
+
+class SemanticSearchEngine:
+    """
+    Semantic engine with lazy initialisation: nothing is loaded at import or
+    construction. The model, the vector store and the vector index are loaded
+    by warmup(), either explicitly, in a background thread (warmup_async()),
+    or on the first search. Load time of each stage is kept in self.timings.
+    Query embeddings go through an LRU cache, so repeated queries skip the model.
+    Movies added since the vector index was built (store segments) are scanned
+    exactly and merged with the index results; deleted rows are masked out.
+    profile selects the encoder and its store/index (see encoders.py).
+    With a result_cache (see result_cache.py), search_documents() results are
+    cached under the store/index version, bumped by every update.
+    """
+
+    def __init__(
+        self,
+        profile=ENCODER_PROFILE,
+        store_path=None,
+        index_path=None,
+        legacy_path=LEGACY_EMBEDDINGS_PATH,
+        query_cache=None,
+        result_cache=None,
+    ):
+        settings = get_profile(profile)
+        self.profile = profile
+        # Identifies the vectors (model + quantization): store metadata and cache key
+        self.model_name = encoder_id(profile)
+        self.store_path = store_path or settings["store"]
+        self.index_path = index_path or settings["index"]
+        self.legacy_path = legacy_path
+
+        self.model = None
+        self.doc_embeddings = None
+        self.vector_index = None
+        # Documents, store segments and deletions (SemanticState), set by warmup()
+        self.state = None
+        self.timings = {}
+        self.query_cache = query_cache or QueryEmbeddingCache(
+            max_size=QUERY_CACHE_SIZE, path=QUERY_CACHE_PATH
+        )
+        if self.query_cache.path:
+            atexit.register(self.query_cache.save)
+        self.result_cache = result_cache
+        # Fingerprint of the loaded store and index, and count of updates since
+        self.data_version = None
+        self.generation = 0
+
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def warmup(self):
+        """Load every stage once; concurrent callers wait for the first one"""
+        if self._ready.is_set():
+            return self
 
-print("Chargement du modèle...")
-model = SentenceTransformer(MODEL_NAME)
+        with self._lock:
+            if self._ready.is_set():
+                return self
 
-with open("data/embeddings.pkl", "rb") as f:
-    data = pickle.load(f)
-    doc_embeddings = data["embeddings"]
-    documents = data["documents"]
-print(f"{len(doc_embeddings)} embeddings chargés.")
+            start = time.perf_counter()
+            print(f"Chargement du modèle ({self.profile})...")
+            self.model = load_encoder(self.profile)
+            self.timings["model"] = time.perf_counter() - start
 
+            start = time.perf_counter()
+            if os.path.exists(self.store_path):
+                # Memory-mapped: only the pages actually scanned are read
+                self.doc_embeddings, documents, meta = load_vector_store(self.store_path)
+                if meta.get("model") not in (None, self.model_name):
+                    print(f"Attention : vector store encodé avec {meta['model']}, requêtes avec {self.model_name}")
+                n_base = len(documents)
+                added_embeddings, added_documents = load_segments(self.store_path)
+                documents.extend(added_documents)
+                self.state = SemanticState(
+                    documents, n_base, added_embeddings, read_tombstones(self.store_path)
+                )
+            else:
+                with open(self.legacy_path, "rb") as f:
+                    data = pickle.load(f)
+                    self.doc_embeddings = data["embeddings"]
+                    self.state = SemanticState(data["documents"], len(data["documents"]))
+            self.timings["store"] = time.perf_counter() - start
+            print(f"{len(self.state.documents)} embeddings chargés.")
 
-def search_documents(query, top_n=10, genre_filter=None, year_filter=None):
+            start = time.perf_counter()
+            self.vector_index = load_vector_index(self.index_path, self.doc_embeddings)
+            self.timings["index"] = time.perf_counter() - start
+            print(f"Index vectoriel : {self.vector_index.kind}")
 
-    query_embedding = model.encode([query])
+            store = self.store_path if os.path.exists(self.store_path) else self.legacy_path
+            self.data_version = folder_version(store, self.index_path)
 
-    similarities = cosine_similarity(query_embedding, doc_embeddings)[0]
+            self._ready.set()
 
-    results = []
+        timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self.timings.items())
+        print(f"Moteur sémantique prêt ({timings})")
+        return self
 
-    for i, score in enumerate(similarities):
+    def warmup_async(self):
+        """Start warmup() in a daemon thread (once) and return the thread"""
+        with self._lock:
+            if self._thread is None and not self._ready.is_set():
+                self._thread = threading.Thread(
+                    target=self.warmup, name="semantic-warmup", daemon=True
+                )
+                self._thread.start()
+        return self._thread
 
-        if score < SIMILARITY_THRESHOLD:
-            continue
+    @property
+    def documents(self):
+        return self.state.documents if self.state is not None else None
 
-        doc = documents[i]
+    def allowed_mask(self, filters, state=None):
+        """Boolean mask of documents passing the filters (see filter_index), or None"""
+        if not filters:
+            return None
+        state = state or self.state
+        if state.filter_index is None:
+            state.filter_index = FilterIndex(state.documents)
+        return state.filter_index.mask(filters)
 
-        title = doc.get("Title", "")
-        genres = doc.get("Genres", "")
-        overview = doc.get("Overview", "")
-        year = str(doc.get("Release_Date", ""))[:4]
-        director = doc.get("Director", "")
-        rating = doc.get("Vote_Average", "")
+    def search_vectors(self, query_embeddings, k, allowed=None, state=None):
+        """
+        vector_index.search() over the indexed rows, merged with an exact scan
+        of the added rows; deleted rows never come back.
+        """
+        state = state or self.state
+        added = state.added_embeddings
+        if added is None and not state.tombstones:
+            return self.vector_index.search(query_embeddings, k, allowed)
 
-        if genre_filter and genre_filter.lower() not in str(genres).lower():
-            continue
-        if year_filter and str(year_filter) not in year:
-            continue
+        n_base = state.n_base
+        if state.tombstones:
+            live = np.ones(n_base + (len(added) if added is not None else 0), dtype=bool)
+            live[list(state.tombstones)] = False
+            allowed = live if allowed is None else allowed & live
 
-        results.append(
-            {
-                "Title": title,
-                "Year": year,
-                "Genres": genres,
-                "Overview": overview,
-                "Director": director,
-                "Rating": rating,
-                "Similarity": round(float(score), 4),
-            }
+        hits = self.vector_index.search(
+            query_embeddings, k, None if allowed is None else allowed[:n_base]
         )
+        if added is None:
+            return hits
+
+        added_scores = np.asarray(query_embeddings, dtype=np.float32) @ added.T
+        if allowed is not None:
+            added_scores[:, ~allowed[n_base:]] = -np.inf
+
+        results = []
+        for (ids, scores), row in zip(hits, added_scores):
+            ids = np.concatenate([np.asarray(ids, dtype=np.int64), np.arange(n_base, n_base + len(row))])
+            scores = np.concatenate([np.asarray(scores, dtype=np.float32), row])
+            keep = np.isfinite(scores)
+            ids, scores = ids[keep], scores[keep]
+            best, values = top_k_rows(scores[None, :], k)
+            results.append((ids[best[0]], values[0]))
+        return results
+
+    def add_documents(self, records):
+        """
+        Embed and store new movies without re-encoding the corpus (one store
+        segment per call). Returns their Doc_Ids, numbered after the largest one
+        when missing. compact (create_embeddings.py --compact) folds segments in.
+        """
+        self.warmup()
+        records = [dict(record) for record in records]
+        if not records:
+            return []
+
+        with self._update_lock:
+            self._apply_update(records)
+        return [record["Doc_Id"] for record in records]
+
+    def update_document(self, doc_id, record):
+        """
+        Re-embed one movie: its current row is deleted and the new version
+        added in the same update, so searches never see the movie missing.
+        """
+        self.warmup()
+        with self._update_lock:
+            self._apply_update([{**record, "Doc_Id": doc_id}], self._live_rows(doc_id))
+        return doc_id
+
+    def delete_document(self, doc_id):
+        """Mark the rows of a movie as deleted (KeyError if it is not stored)"""
+        self.warmup()
+        with self._update_lock:
+            self._apply_update([], self._live_rows(doc_id))
+
+    def _live_rows(self, doc_id):
+        state = self.state
+        rows = [
+            row
+            for row, value in enumerate(state.documents.columns["Doc_Id"])
+            if value == doc_id and row not in state.tombstones
+        ]
+        if not rows:
+            raise KeyError(doc_id)
+        return rows
+
+    def _apply_update(self, records, deleted_rows=()):
+        """
+        Store added records as a segment and deleted rows as tombstones, then
+        publish the new SemanticState. The caller holds _update_lock.
+        """
+        if not os.path.exists(self.store_path):
+            raise ValueError("Incremental updates require a vector store (see vector_store.py)")
+
+        state = self.state
+        documents, added = state.documents, state.added_embeddings
+        if records:
+            known = [doc_id for doc_id in documents.columns["Doc_Id"] if doc_id is not None]
+            next_doc_id = max(known) + 1 if known else 0
+            for record in records:
+                if record.get("Doc_Id") is None:
+                    record["Doc_Id"] = next_doc_id
+                    next_doc_id += 1
+
+            embeddings = self.model.encode(
+                [document_text(record) for record in records], normalize_embeddings=True
+            )
+            path = append_segment(self.store_path, embeddings, records)
+
+            # Reload the segment to search the vectors exactly as stored (float16/int8)
+            stored, _, _ = load_vector_store(path, mmap=False)
+            stored = np.asarray(stored, dtype=np.float32)
+            documents = documents.extended(records)
+            added = stored if added is None else np.concatenate([added, stored])
+
+        tombstones = state.tombstones
+        if deleted_rows:
+            tombstones = tombstones | set(deleted_rows)
+            write_tombstones(self.store_path, tombstones)
+
+        self.state = SemanticState(documents, state.n_base, added, tombstones)
+        self.generation += 1
+
+    def encode(self, queries, batch_size=32):
+        """Query embeddings, served from the cache when possible"""
+        embeddings = [self.query_cache.get(self.model_name, query) for query in queries]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        if missing:
+            # Document embeddings are normalized, so inner product == cosine similarity
+            encoded = self.model.encode(
+                [queries[i] for i in missing],
+                batch_size=batch_size,
+                normalize_embeddings=True,
+            )
+            for i, embedding in zip(missing, encoded):
+                embeddings[i] = embedding
+                self.query_cache.put(self.model_name, queries[i], embedding)
+
+        return np.stack(embeddings)
+
+    def rank_documents(self, doc_ids, similarities, top_n=10, genre_filter=None, year_filter=None, state=None):
+        """Turn retrieved (doc_ids, similarities) into the filtered, sorted result list"""
+        documents = (state or self.state).documents
+
+        results = []
+
+        for i, score in zip(doc_ids, similarities):
+
+            if score < SIMILARITY_THRESHOLD:
+                continue
+
+            doc = documents[i]
+
+            title = doc.get("Title", "")
+            genres = doc.get("Genres", "")
+            overview = doc.get("Overview", "")
+            year = str(doc.get("Release_Date", ""))[:4]
+            director = doc.get("Director", "")
+            rating = doc.get("Vote_Average", "")
+            doc_id = doc.get("Doc_Id")
+
+            if genre_filter and genre_filter.lower() not in str(genres).lower():
+                continue
+            if year_filter and str(year_filter) not in year:
+                continue
+
+            results.append(
+                {
+                    "Doc_Id": doc_id,
+                    "Title": title,
+                    "Year": year,
+                    "Genres": genres,
+                    "Overview": overview,
+                    "Director": director,
+                    "Rating": rating,
+                    "Similarity": round(float(score), 4),
+                }
+            )
+
+        results = sorted(results, key=lambda x: x["Similarity"], reverse=True)[:top_n]
+
+        return results
+
+    @staticmethod
+    def candidate_count(top_n, genre_filter=None, year_filter=None):
+        """Neighbours to retrieve: results are sorted, so top_n suffices without filters"""
+        if genre_filter or year_filter:
+            return max(top_n, FILTERED_CANDIDATES)
+        return top_n
+
+    def cache_version(self):
+        """Version of the searched data, part of the result cache key"""
+        return f"{self.model_name}:{self.data_version}:{self.generation}"
+
+    def search_documents(self, query, top_n=10, genre_filter=None, year_filter=None, filters=None):
+        """
+        filters (genre, year, min_rating, runtime, director, actor) are pushed
+        down into the vector index: only matching documents are ranked.
+        """
+
+        self.warmup()
+        if self.result_cache is None:
+            return self.search_uncached(query, top_n, genre_filter, year_filter, filters)
+
+        key_filters = {**(filters or {}), "genre_filter": genre_filter, "year_filter": year_filter}
+        return self.result_cache.get_or_compute(
+            "semantic", self.cache_version(), query, top_n, key_filters,
+            lambda: self.search_uncached(query, top_n, genre_filter, year_filter, filters),
+        )
+
+    def search_page(self, query, offset=0, limit=PAGE_SIZE, filters=None, cursor=None, postprocess=None):
+        """
+        Cursor-based pagination: the first call ranks up to MAX_RESULTS movies
+        and keeps them server-side (see pagination.py); pass the returned cursor
+        back with the next offset to fetch the following pages.
+        """
+        def compute():
+            results = self.search_documents(query, top_n=MAX_RESULTS, filters=filters)
+            return postprocess(results) if postprocess else results
+
+        return cursor_store.search_page(compute, offset, limit, cursor)
+
+    def search_uncached(self, query, top_n=10, genre_filter=None, year_filter=None, filters=None):
+        query_embedding = self.encode([query])
+
+        # One consistent set of rows for the whole query, even if an update
+        # publishes a new one meanwhile
+        state = self.state
+        k = self.candidate_count(top_n, genre_filter, year_filter)
+        allowed = self.allowed_mask(filters, state)
+        doc_ids, similarities = self.search_vectors(query_embedding, k, allowed, state)[0]
+
+        return self.rank_documents(doc_ids, similarities, top_n, genre_filter, year_filter, state)
+
+    def search_many(
+        self, queries, top_n=10, genre_filter=None, year_filter=None, batch_size=32, filters=None
+    ):
+        """
+        Batched search_documents(): every query is encoded in one model.encode()
+        call and all of them are looked up in one vector_index.search() call.
+        Returns one result list per query, in order.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+
+        self.warmup()
+        query_embeddings = self.encode(queries, batch_size=batch_size)
+
+        state = self.state
+        k = self.candidate_count(top_n, genre_filter, year_filter)
+        hits = self.search_vectors(query_embeddings, k, self.allowed_mask(filters, state), state)
+
+        return [
+            self.rank_documents(doc_ids, similarities, top_n, genre_filter, year_filter, state)
+            for doc_ids, similarities in hits
+        ]
+
+
+# Process-wide engine; importing this module loads nothing
+engine = SemanticSearchEngine(result_cache=result_cache)
+
+
+def warmup():
+    return engine.warmup()
+
+
+def search_documents(query, top_n=10, genre_filter=None, year_filter=None, filters=None):
+    return engine.search_documents(query, top_n, genre_filter, year_filter, filters)
+
+
+def search_page(query, offset=0, limit=PAGE_SIZE, filters=None, cursor=None, postprocess=None):
+    return engine.search_page(query, offset, limit, filters, cursor, postprocess)
 
-    results = sorted(results, key=lambda x: x["Similarity"], reverse=True)[:top_n]
 
-    return results
+def search_many(queries, top_n=10, genre_filter=None, year_filter=None, batch_size=32, filters=None):
+    return engine.search_many(queries, top_n, genre_filter, year_filter, batch_size, filters)
 
 
 # -------- Test --------
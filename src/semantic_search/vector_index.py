@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+
+try:
+    from .vector_store import swap_folder
+except ImportError:  # run as a script from src/semantic_search
+    from vector_store import swap_folder
+
+# Vector indexes over L2-normalized embeddings: inner product == cosine similarity.
+#
+#   flat  exact brute-force scan
+#   ivf   k-means inverted file; n_probe trades recall for latency
+#   hnsw  graph index (hnswlib, optional dependency); ef_search trades recall for latency
+#
+# Every index answers search(queries, k, allowed=None) with one (doc_ids, scores)
+# pair per query, best first. allowed is an optional boolean mask over the
+# documents (filter pushdown): only those documents are returned.
+
+META_FILE = "index_meta.json"
+# IVF: a filter matching at most this fraction of the documents is answered by
+# an exact scan of the matches instead of the n_probe closest lists
+EXACT_FILTER_FRACTION = 0.05
+
+
+def inner_products(queries, vectors, chunk_size=65536):
+    """
+    queries @ vectors.T, computed in row chunks so memory-mapped float16 or
+    int8 stores (see vector_store) are never upcast in full.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    codes = getattr(vectors, "codes", vectors)
+    scales = getattr(vectors, "scales", None)
+
+    scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+    for start in range(0, len(codes), chunk_size):
+        block = np.asarray(codes[start:start + chunk_size], dtype=np.float32)
+        scores[:, start:start + len(block)] = queries @ block.T
+
+    if scales is not None:
+        scores *= np.asarray(scales, dtype=np.float32)[None, :]
+    return scores
+
+
+def top_k_rows(scores, k):
+    """Indices and values of the k largest entries of each row, best first"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.zeros((len(scores), 0), dtype=np.int64), np.zeros((len(scores), 0))
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (len(scores), 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+class FlatIndex:
+    """Exact inner-product search over the full embedding matrix"""
+
+    kind = "flat"
+
+    def __init__(self):
+        self.vectors = None
+
+    def build(self, vectors):
+        self.vectors = vectors
+        return self
+
+    def search(self, queries, k, allowed=None):
+        scores = inner_products(queries, self.vectors)
+        if allowed is not None:
+            k = min(k, int(np.count_nonzero(allowed)))
+            scores[:, ~allowed] = -np.inf
+        ids, values = top_k_rows(scores, k)
+        return list(zip(ids, values))
+
+    def params(self):
+        return {}
+
+    def save(self, folder):
+        pass
+
+    def load(self, folder, vectors):
+        self.vectors = vectors
+        return self
+
+
+class IVFIndex:
+    """
+    Inverted file index: documents are bucketed by their nearest k-means
+    centroid and a query only scans the n_probe closest buckets.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, n_lists=None, n_probe=8, n_iter=20, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.vectors = None
+
+    def build(self, vectors):
+        self.vectors = vectors
+        data = np.asarray(vectors, dtype=np.float32)
+        n = len(data)
+        n_lists = min(n, self.n_lists or max(1, int(np.sqrt(n))))
+        rng = np.random.default_rng(self.seed)
+
+        # Spherical k-means: centroids stay unit-norm, assignment by inner product
+        centroids = data[rng.choice(n, n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignment = self._assign(data, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, data)
+            counts = np.bincount(assignment, minlength=n_lists)
+            empty = counts == 0
+            # Re-seed empty lists with random documents
+            sums[empty] = data[rng.choice(n, int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        assignment = self._assign(data, centroids)
+        self.n_lists = n_lists
+        self.centroids = centroids.astype(np.float32)
+        self.list_ids = np.argsort(assignment, kind="stable").astype(np.int64)
+        self.list_offsets = np.searchsorted(
+            assignment[self.list_ids], np.arange(n_lists + 1)
+        ).astype(np.int64)
+        return self
+
+    @staticmethod
+    def _assign(data, centroids, chunk_size=8192):
+        return np.concatenate(
+            [
+                np.argmax(data[i:i + chunk_size] @ centroids.T, axis=1)
+                for i in range(0, len(data), chunk_size)
+            ]
+        )
+
+    def search(self, queries, k, allowed=None):
+        queries = np.asarray(queries, dtype=np.float32)
+        n_probe = min(self.n_probe, self.n_lists)
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :n_probe]
+
+        matching = None
+        if allowed is not None:
+            matching = np.flatnonzero(allowed)
+            k = min(k, len(matching))
+            # Few documents pass the filter: scanning them exactly is cheap
+            # and the probed lists would hold only a handful of them
+            if len(matching) <= EXACT_FILTER_FRACTION * len(allowed):
+                probes = [None] * len(queries)
+
+        results = []
+        for query, lists in zip(queries, probes):
+            ids = matching
+            if lists is not None:
+                ids = np.concatenate(
+                    [self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]] for c in lists]
+                )
+                if allowed is not None:
+                    ids = ids[allowed[ids]]
+                    if len(ids) < k:
+                        # The probed lists miss matches the corpus does have
+                        ids = matching
+            scores = np.asarray(self.vectors[ids], dtype=np.float32) @ query
+            best, values = top_k_rows(scores[None, :], k)
+            results.append((ids[best[0]], values[0]))
+        return results
+
+    def params(self):
+        return {"n_lists": self.n_lists, "n_probe": self.n_probe}
+
+    def save(self, folder):
+        np.save(os.path.join(folder, "ivf_centroids.npy"), self.centroids)
+        np.save(os.path.join(folder, "ivf_list_ids.npy"), self.list_ids)
+        np.save(os.path.join(folder, "ivf_list_offsets.npy"), self.list_offsets)
+
+    def load(self, folder, vectors):
+        self.vectors = vectors
+        self.centroids = np.load(os.path.join(folder, "ivf_centroids.npy"))
+        self.list_ids = np.load(os.path.join(folder, "ivf_list_ids.npy"), mmap_mode="r")
+        self.list_offsets = np.load(os.path.join(folder, "ivf_list_offsets.npy"))
+        self.n_lists = len(self.centroids)
+        return self
+
+
+class HNSWIndex:
+    """Hierarchical navigable small-world graph (requires hnswlib)"""
+
+    kind = "hnsw"
+
+    def __init__(self, M=16, ef_construction=200, ef_search=64):
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.graph = None
+
+    @staticmethod
+    def _hnswlib():
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("The HNSW index requires hnswlib: pip install hnswlib") from e
+        return hnswlib
+
+    def build(self, vectors):
+        hnswlib = self._hnswlib()
+        data = np.asarray(vectors, dtype=np.float32)
+        self.graph = hnswlib.Index(space="ip", dim=data.shape[1])
+        self.graph.init_index(
+            max_elements=len(data), ef_construction=self.ef_construction, M=self.M
+        )
+        self.graph.add_items(data, np.arange(len(data)))
+        self.graph.set_ef(self.ef_search)
+        return self
+
+    def search(self, queries, k, allowed=None):
+        queries = np.asarray(queries, dtype=np.float32)
+        k = min(k, self.graph.get_current_count())
+        if allowed is None:
+            # hnswlib needs ef >= k
+            self.graph.set_ef(max(self.ef_search, k))
+            labels, distances = self.graph.knn_query(queries, k=k)
+        else:
+            k = min(k, int(np.count_nonzero(allowed)))
+            if k == 0:
+                return [(np.zeros(0, dtype=np.int64), np.zeros(0)) for _ in queries]
+            self.graph.set_ef(max(self.ef_search, k))
+            labels, distances = self.graph.knn_query(
+                queries, k=k, num_threads=1, filter=lambda label: bool(allowed[label])
+            )
+        # "ip" distance is 1 - inner product
+        return [(ids.astype(np.int64), 1.0 - dist) for ids, dist in zip(labels, distances)]
+
+    def params(self):
+        return {"M": self.M, "ef_construction": self.ef_construction, "ef_search": self.ef_search}
+
+    def save(self, folder):
+        self.graph.save_index(os.path.join(folder, "hnsw.bin"))
+
+    def load(self, folder, vectors):
+        hnswlib = self._hnswlib()
+        self.graph = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        self.graph.load_index(os.path.join(folder, "hnsw.bin"), max_elements=len(vectors))
+        self.graph.set_ef(self.ef_search)
+        return self
+
+
+INDEX_TYPES = {cls.kind: cls for cls in (FlatIndex, IVFIndex, HNSWIndex)}
+
+
+def build_vector_index(vectors, kind="flat", **params):
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{kind}', expected one of {sorted(INDEX_TYPES)}")
+    return INDEX_TYPES[kind](**params).build(vectors)
+
+
+def save_vector_index(index, folder):
+    """Write the index into <folder>.tmp and swap it in (its files are memory-mapped by servers)"""
+    folder = folder.rstrip("/\\")
+    tmp = folder + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    index.save(tmp)
+    with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"kind": index.kind, "params": index.params()}, f)
+    swap_folder(tmp, folder)
+
+
+def load_vector_index(folder, vectors, **overrides):
+    """
+    Load a saved index for the given embedding matrix. Missing folder -> flat.
+    overrides adjust search-time parameters such as n_probe or ef_search.
+    """
+    meta_path = os.path.join(folder, META_FILE)
+    if not os.path.exists(meta_path):
+        return FlatIndex().build(vectors)
+
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    params = {**meta["params"], **overrides}
+    return INDEX_TYPES[meta["kind"]](**params).load(folder, vectors)
+
+
+def compare_to_exact(index, vectors, queries, k=10):
+    """Recall@k against brute force and mean latency per query (ms)"""
+    exact = FlatIndex().build(vectors).search(queries, k)
+
+    start = time.perf_counter()
+    approx = [index.search(query[None, :], k)[0] for query in queries]
+    latency_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+
+    hits = sum(
+        len(set(true_ids.tolist()) & set(found_ids.tolist()))
+        for (true_ids, _), (found_ids, _) in zip(exact, approx)
+    )
+    recall = hits / max(sum(len(true_ids) for true_ids, _ in exact), 1)
+    return {"kind": index.kind, **index.params(), "recall": recall, "latency_ms": latency_ms}
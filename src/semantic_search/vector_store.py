@@ -0,0 +1,452 @@
+import os
+import sys
+import json
+import pickle
+import shutil
+import hashlib
+import numpy as np
+
+# Vector store layout (one folder):
+#   store_meta.json  dtype, dimension, count, model name
+#   embeddings.npy   (count, dim) float32 / float16, or int8 codes
+#   scales.npy       per-row dequantization scale (int8 only)
+#   documents.json   compact columnar document table
+#   content_hashes.json  Doc_Id -> hash of the embedded text (skips unchanged movies)
+#   segments/segment_00001/  movies added later, each a store of the same layout
+#   tombstones.json          deleted rows (base rows first, then segment rows)
+# embeddings.npy is memory-mapped: opening the store reads no vector data and
+# every process serving the same folder shares the page cache.
+# compact_vector_store() folds segments and tombstones back into the base.
+
+META_FILE = "store_meta.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+SCALES_FILE = "scales.npy"
+DOCUMENTS_FILE = "documents.json"
+SEGMENTS_DIR = "segments"
+TOMBSTONES_FILE = "tombstones.json"
+HASHES_FILE = "content_hashes.json"
+# Staging folder of VectorStoreWriter (<store>.build) and its progress file
+BUILD_SUFFIX = ".build"
+CHECKPOINT_FILE = "checkpoint.json"
+
+# Only the columns the search results and filters need are kept in the document table
+DOC_COLUMNS = [
+    "Doc_Id",
+    "Title",
+    "Overview",
+    "Genres",
+    "Director",
+    "Release_Date",
+    "Vote_Average",
+    "Runtime",
+    "Cast",
+]
+STORE_DTYPES = ["float32", "float16", "int8"]
+
+
+class QuantizedVectors:
+    """int8 codes with one scale per row; rows come back dequantized as float32"""
+
+    def __init__(self, codes, scales):
+        self.codes = codes
+        self.scales = scales
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, ids):
+        rows = np.asarray(self.codes[ids], dtype=np.float32)
+        scales = np.asarray(self.scales[ids], dtype=np.float32)
+        return rows * scales[..., None]
+
+    def __array__(self, dtype=None, copy=None):
+        vectors = self[:]
+        return vectors if dtype is None else vectors.astype(dtype)
+
+
+class DocumentTable:
+    """Columnar document table, indexed by row number like the embedding matrix"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.length = len(next(iter(columns.values()), []))
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        return {name: values[i] for name, values in self.columns.items()}
+
+    def __iter__(self):
+        return (self[i] for i in range(self.length))
+
+    def extend(self, documents):
+        """Append rows (e.g. the documents of store segments)"""
+        for doc in documents:
+            for name, values in self.columns.items():
+                values.append(doc.get(name, None if name == "Doc_Id" else ""))
+        self.length = len(next(iter(self.columns.values()), []))
+
+    def extended(self, documents):
+        """Copy of the table with rows appended; this one stays as is for its readers"""
+        table = DocumentTable({name: list(values) for name, values in self.columns.items()})
+        table.extend(documents)
+        return table
+
+
+def document_text(doc):
+    """Text embedded for a movie"""
+    return f"""
+            Title: {doc.get('Title','')}
+            Overview: {doc.get('Overview','')}
+            Keywords: {doc.get('Keywords','')}
+            Genres: {doc.get('Genres','')}
+            Director: {doc.get('Director','')}
+            Cast: {doc.get('Cast','')}
+            Year: {str(doc.get('Release_Date',''))[:4]} 
+            Tagline: {doc.get('Tagline','')}
+            """
+
+
+def content_hash(text):
+    """Fingerprint of the text embedded for a movie"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def document_columns(documents):
+    return {
+        name: [doc.get(name, None if name == "Doc_Id" else "") for doc in documents]
+        for name in DOC_COLUMNS
+    }
+
+
+def quantize_int8(embeddings):
+    """Symmetric per-row int8 quantization"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def swap_folder(tmp, folder):
+    """
+    Replace folder by the fully written tmp folder. Processes that memory-map
+    files of the old folder keep reading them (the inodes stay alive) instead
+    of seeing a file rewritten in place under their mapping (SIGBUS).
+    """
+    old = folder + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(folder):
+        os.rename(folder, old)
+    os.rename(tmp, folder)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def save_vector_store(folder, embeddings, documents, dtype="float32", model_name=None, hashes=None):
+    """
+    Write a store into <folder>.tmp and swap it in: a new base replaces the
+    segments and tombstones of the previous one. Content hashes (Doc_Id ->
+    hash) are written when given, otherwise kept from the previous store.
+    QuantizedVectors are written as they are in an int8 store.
+    """
+    if dtype not in STORE_DTYPES:
+        raise ValueError(f"Unsupported dtype '{dtype}', expected one of {STORE_DTYPES}")
+    folder = folder.rstrip("/\\")
+    tmp = folder + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    if dtype == "int8" and isinstance(embeddings, QuantizedVectors):
+        codes, scales = embeddings.codes, embeddings.scales
+    elif dtype == "int8":
+        codes, scales = quantize_int8(embeddings)
+    else:
+        codes, scales = np.asarray(embeddings).astype(dtype), None
+    np.save(os.path.join(tmp, EMBEDDINGS_FILE), codes)
+    if scales is not None:
+        np.save(os.path.join(tmp, SCALES_FILE), scales)
+
+    with open(os.path.join(tmp, DOCUMENTS_FILE), "w", encoding="utf-8") as f:
+        json.dump(document_columns(documents), f, ensure_ascii=False)
+    if hashes is not None:
+        with open(os.path.join(tmp, HASHES_FILE), "w", encoding="utf-8") as f:
+            json.dump({int(doc_id): digest for doc_id, digest in hashes.items()}, f)
+    elif os.path.exists(os.path.join(folder, HASHES_FILE)):
+        shutil.copyfile(os.path.join(folder, HASHES_FILE), os.path.join(tmp, HASHES_FILE))
+
+    meta = {
+        "dtype": dtype,
+        "count": int(codes.shape[0]),
+        "dim": int(codes.shape[1]) if codes.ndim == 2 else 0,
+        "model": model_name,
+    }
+    with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    swap_folder(tmp, folder)
+
+
+def load_vector_store(folder, mmap=True):
+    """Return (embeddings, documents, meta) with the embeddings memory-mapped"""
+    with open(os.path.join(folder, META_FILE), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    mmap_mode = "r" if mmap else None
+    embeddings = np.load(os.path.join(folder, EMBEDDINGS_FILE), mmap_mode=mmap_mode)
+    if meta["dtype"] == "int8":
+        scales = np.load(os.path.join(folder, SCALES_FILE))
+        embeddings = QuantizedVectors(embeddings, scales)
+
+    with open(os.path.join(folder, DOCUMENTS_FILE), "r", encoding="utf-8") as f:
+        documents = DocumentTable(json.load(f))
+
+    return embeddings, documents, meta
+
+
+def load_content_hashes(folder):
+    """Doc_Id -> content hash of a store, empty if it has none"""
+    path = os.path.join(folder, HASHES_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {int(doc_id): digest for doc_id, digest in json.load(f).items()}
+
+
+class VectorStoreWriter:
+    """
+    Streaming writer for a vector store. Each append() stores one chunk in a
+    staging folder (<folder>.build) and records it in a checkpoint, so an
+    interrupted run resumes after the last complete chunk. close() assembles
+    the final store in one pass over the chunks and swaps it in.
+    """
+
+    def __init__(self, folder, dtype="float32", model_name=None, resume=True):
+        if dtype not in STORE_DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}', expected one of {STORE_DTYPES}")
+        self.folder = folder.rstrip("/\\")
+        self.staging = self.folder + BUILD_SUFFIX
+        self.dtype = dtype
+        self.model_name = model_name
+
+        checkpoint = None
+        checkpoint_path = os.path.join(self.staging, CHECKPOINT_FILE)
+        if resume and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            if checkpoint.get("dtype") != dtype or checkpoint.get("model") != model_name:
+                checkpoint = None
+
+        if checkpoint is None:
+            shutil.rmtree(self.staging, ignore_errors=True)
+            os.makedirs(self.staging)
+            checkpoint = {"dtype": dtype, "model": model_name, "chunks": 0, "documents": 0}
+            self._save_checkpoint(checkpoint)
+        self.checkpoint = checkpoint
+
+    @property
+    def documents_done(self):
+        """Documents already stored by previous runs (skip them in the input)"""
+        return self.checkpoint["documents"]
+
+    def _chunk_path(self, number, suffix):
+        return os.path.join(self.staging, f"chunk_{number:05d}{suffix}")
+
+    def _save_checkpoint(self, checkpoint):
+        path = os.path.join(self.staging, CHECKPOINT_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(path + ".tmp", path)
+
+    def append(self, embeddings, documents, hashes):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        number = self.checkpoint["chunks"] + 1
+
+        if self.dtype == "int8":
+            codes, scales = quantize_int8(embeddings)
+            np.save(self._chunk_path(number, ".npy"), codes)
+            np.save(self._chunk_path(number, "_scales.npy"), scales)
+        else:
+            np.save(self._chunk_path(number, ".npy"), embeddings.astype(self.dtype))
+        with open(self._chunk_path(number, ".json"), "w", encoding="utf-8") as f:
+            # Only the document table columns are kept
+            documents = [{name: doc[name] for name in DOC_COLUMNS if name in doc} for doc in documents]
+            json.dump({"documents": documents, "hashes": list(hashes)}, f, ensure_ascii=False)
+
+        # The checkpoint moves only once the chunk is complete on disk
+        self.checkpoint = {
+            **self.checkpoint,
+            "chunks": number,
+            "documents": self.checkpoint["documents"] + len(documents),
+        }
+        self._save_checkpoint(self.checkpoint)
+
+    def close(self):
+        """Assemble the chunks into the store folder and remove the staging folder"""
+        chunks = range(1, self.checkpoint["chunks"] + 1)
+        shapes = [np.load(self._chunk_path(n, ".npy"), mmap_mode="r").shape for n in chunks]
+        count = sum(shape[0] for shape in shapes)
+        dim = shapes[0][1] if shapes else 0
+
+        tmp = self.folder + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        stored_dtype = np.int8 if self.dtype == "int8" else self.dtype
+        out = np.lib.format.open_memmap(
+            os.path.join(tmp, EMBEDDINGS_FILE), mode="w+", dtype=stored_dtype, shape=(count, dim)
+        )
+        scales = np.empty(count, dtype=np.float32) if self.dtype == "int8" else None
+        documents = []
+        hashes = {}
+
+        row = 0
+        for n in chunks:
+            block = np.load(self._chunk_path(n, ".npy"))
+            out[row:row + len(block)] = block
+            if scales is not None:
+                scales[row:row + len(block)] = np.load(self._chunk_path(n, "_scales.npy"))
+            with open(self._chunk_path(n, ".json"), "r", encoding="utf-8") as f:
+                chunk = json.load(f)
+            documents.extend(chunk["documents"])
+            for doc, digest in zip(chunk["documents"], chunk["hashes"]):
+                if doc.get("Doc_Id") is not None:
+                    hashes[int(doc["Doc_Id"])] = digest
+            row += len(block)
+        out.flush()
+        del out
+
+        if scales is not None:
+            np.save(os.path.join(tmp, SCALES_FILE), scales)
+        with open(os.path.join(tmp, DOCUMENTS_FILE), "w", encoding="utf-8") as f:
+            json.dump(document_columns(documents), f, ensure_ascii=False)
+        with open(os.path.join(tmp, HASHES_FILE), "w", encoding="utf-8") as f:
+            json.dump(hashes, f)
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "count": count, "dim": dim, "model": self.model_name}, f)
+
+        # Swap in the new store (its segments and tombstones are superseded)
+        swap_folder(tmp, self.folder)
+        shutil.rmtree(self.staging, ignore_errors=True)
+        return count
+
+
+def segment_folders(folder):
+    """Segment stores of a vector store, oldest first"""
+    root = os.path.join(folder, SEGMENTS_DIR)
+    if not os.path.isdir(root):
+        return []
+    # Skip the .tmp / .old folders of a segment being written
+    return [
+        os.path.join(root, name)
+        for name in sorted(os.listdir(root))
+        if name.startswith("segment_") and "." not in name
+    ]
+
+
+def append_segment(folder, embeddings, documents):
+    """
+    Store embeddings of added movies as a new segment, in the base dtype,
+    with the content hashes of the full documents (compaction keeps them).
+    """
+    with open(os.path.join(folder, META_FILE), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    hashes = {
+        doc["Doc_Id"]: content_hash(document_text(doc))
+        for doc in documents
+        if doc.get("Doc_Id") is not None
+    }
+    existing = segment_folders(folder)
+    number = int(os.path.basename(existing[-1])[8:]) + 1 if existing else 1
+    path = os.path.join(folder, SEGMENTS_DIR, f"segment_{number:05d}")
+    save_vector_store(
+        path, embeddings, documents, dtype=meta["dtype"], model_name=meta["model"], hashes=hashes
+    )
+    return path
+
+
+def load_segments(folder):
+    """(float32 embeddings, documents) of every segment, or (None, []) without segments"""
+    embeddings = []
+    documents = []
+    for path in segment_folders(folder):
+        vectors, docs, _ = load_vector_store(path, mmap=False)
+        embeddings.append(np.asarray(vectors, dtype=np.float32))
+        documents.extend(docs)
+    if not embeddings:
+        return None, []
+    return np.concatenate(embeddings), documents
+
+
+def read_tombstones(folder):
+    path = os.path.join(folder, TOMBSTONES_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return set(json.load(f))
+
+
+def write_tombstones(folder, rows):
+    path = os.path.join(folder, TOMBSTONES_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(sorted(int(row) for row in rows), f)
+    os.replace(path + ".tmp", path)
+
+
+def compact_vector_store(folder):
+    """
+    Fold segments into the base store and drop deleted rows. Rows are copied
+    in their stored dtype (int8 codes and scales are not re-quantized) and the
+    content hashes follow the rows that remain.
+    Returns the new (float32 embeddings, documents); the vector index must be rebuilt.
+    """
+    embeddings, documents, meta = load_vector_store(folder, mmap=False)
+    vectors = [embeddings]
+    documents = list(documents)
+    hashes = load_content_hashes(folder)
+    for path in segment_folders(folder):
+        added, added_documents, _ = load_vector_store(path, mmap=False)
+        vectors.append(added)
+        documents.extend(added_documents)
+        # Segments are newer than the base: their hashes win
+        hashes.update(load_content_hashes(path))
+
+    deleted = read_tombstones(folder)
+    live = [row for row in range(len(documents)) if row not in deleted]
+    documents = [documents[row] for row in live]
+    live_ids = {doc["Doc_Id"] for doc in documents}
+    hashes = {doc_id: digest for doc_id, digest in hashes.items() if doc_id in live_ids}
+
+    if meta["dtype"] == "int8":
+        codes = np.concatenate([added.codes for added in vectors])
+        scales = np.concatenate([added.scales for added in vectors])
+        embeddings = QuantizedVectors(codes[live], scales[live])
+    else:
+        embeddings = np.concatenate(vectors)[live]
+
+    save_vector_store(
+        folder, embeddings, documents, dtype=meta["dtype"], model_name=meta["model"], hashes=hashes
+    )
+    return np.asarray(embeddings, dtype=np.float32), documents
+
+
+def convert_pickle(pickle_path, folder, dtype="float32"):
+    """Migrate a legacy embeddings.pkl to the vector store format"""
+    with open(pickle_path, "rb") as f:
+        data = pickle.load(f)
+    save_vector_store(folder, data["embeddings"], data["documents"], dtype=dtype)
+    print(f"Vector store écrit : {folder} ({dtype})")
+
+
+if __name__ == "__main__":
+    # python src/semantic_search/vector_store.py data/embeddings.pkl data/vector_store [float16]
+    convert_pickle(
+        sys.argv[1] if len(sys.argv) > 1 else "data/embeddings.pkl",
+        sys.argv[2] if len(sys.argv) > 2 else "data/vector_store",
+        sys.argv[3] if len(sys.argv) > 3 else "float32",
+    )
@@ -2,19 +2,30 @@ import pandas as pd
 import json
 import os
 
-def split_csv_to_json(input_csv, output_dir):
+from common.document_store import CHUNK_SIZE, DOCUMENTS_PATH, DocumentWriter
+
+
+def split_csv_to_json(input_csv, output_dir, limit=None):
+    """Legacy layout: one row_N.json file per movie"""
     os.makedirs(output_dir, exist_ok=True)
     df = pd.read_csv(input_csv)
-    df_sample = df.head(3500)
+    df_sample = df.head(limit) if limit else df
     for index, row in df_sample.iterrows():
         json_data = row.to_dict()
         output_file = os.path.join(output_dir, f"row_{index + 1}.json")
         with open(output_file, 'w') as json_file:
             json.dump(json_data, json_file, indent=4)
-            
-            
-split_csv_to_json('data/cleaned_movies.csv', 'data/Docs')
 
 
+def split_csv_to_store(input_csv, output_path=DOCUMENTS_PATH, chunk_size=CHUNK_SIZE):
+    """Write every movie to the consolidated document store, chunk by chunk"""
+    with DocumentWriter(output_path) as writer:
+        # Chunks keep a running RangeIndex: the CSV row number, i.e. the Doc_Id
+        for chunk in pd.read_csv(input_csv, chunksize=chunk_size):
+            chunk["Doc_Id"] = chunk.index
+            writer.write(chunk.to_dict("records"))
 
 
+if __name__ == "__main__":
+    # python src/split_to_json.py
+    split_csv_to_store('data/cleaned_movies.csv', DOCUMENTS_PATH)